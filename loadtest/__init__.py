@@ -0,0 +1,5 @@
+"""
+Load-testing harness: a local stand-in for Paystack, exchange-rate-api and ipapi
+(`python -m loadtest.stub_server`) and a load driver (`python -m loadtest.driver`).
+Neither imports Django, so both can run on a separate machine from the app.
+"""
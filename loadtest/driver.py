@@ -0,0 +1,140 @@
+"""
+Closed-loop load driver for the payment API.
+
+    gunicorn mainapp.wsgi -w 4 -b 127.0.0.1:8000     # with the stub_server env vars set
+    python -m loadtest.driver --base-url http://127.0.0.1:8000 --duration 60 --concurrency 32 \
+        --mix initiate=1,verify=2,list=4
+
+Each worker thread keeps one keep-alive session and picks the next scenario by weight.
+Verify calls reuse references returned by earlier initiations. Prints throughput,
+error counts and p50/p95/p99 latency per endpoint.
+"""
+import argparse
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+SCENARIOS = ('initiate', 'verify', 'list')
+STATES = ('Lagos', 'Abuja', 'Rivers', 'Oyo', 'Kano')
+COUNTRIES = ('Nigeria', 'United States', 'United Kingdom', 'Ghana', 'Kenya', '')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}' (expected: {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Driver:
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.references = []
+        self.lock = threading.Lock()
+
+    def record(self, name, elapsed, ok):
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            if not ok:
+                self.errors[name] += 1
+
+    def call(self, session, name, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException:
+            self.record(name, time.perf_counter() - started, False)
+            return None
+        self.record(name, time.perf_counter() - started, response.status_code < 400)
+        return response
+
+    def initiate(self, session, rng):
+        response = self.call(session, 'initiate', 'POST', '/api/v1/payment/', json={
+            'name': f'Load Tester {rng.randrange(10 ** 6)}',
+            'email': f'load{rng.randrange(10 ** 9)}@gmail.com',
+            'phone_number': f'080{rng.randrange(10 ** 7, 10 ** 8)}',
+            'amount': f'{rng.uniform(1, 500):.2f}',
+            'state': rng.choice(STATES),
+            'country': rng.choice(COUNTRIES),
+        })
+        if response is not None and response.status_code == 201:
+            reference = response.json().get('payment', {}).get('reference')
+            if reference:
+                with self.lock:
+                    self.references.append(reference)
+
+    def verify(self, session, rng):
+        with self.lock:
+            reference = rng.choice(self.references) if self.references else None
+        if reference is None:
+            return self.initiate(session, rng)
+        self.call(session, 'verify', 'GET', f'/api/v1/payment/verify/{reference}/')
+
+    def list(self, session, rng):
+        self.call(session, 'list', 'GET', '/api/v1/payments/', params={'page_size': 50})
+
+    def run(self, mix, duration, concurrency, seed=None):
+        names, weights = zip(*mix.items())
+        deadline = time.monotonic() + duration
+
+        def worker(index):
+            rng = random.Random(None if seed is None else seed + index)
+            with requests.Session() as session:
+                while time.monotonic() < deadline:
+                    getattr(self, rng.choices(names, weights)[0])(session, rng)
+
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.monotonic() - started
+
+    def report(self, elapsed):
+        lines = [f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"]
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            lines.append(
+                f"{name:<10}{len(values):>10}{self.errors[name]:>8}{len(values) / elapsed:>9.1f}"
+                + ''.join(f"{percentile(values, p) * 1000:>9.1f}" for p in (0.50, 0.95, 0.99))
+            )
+        total = sum(len(v) for v in self.latencies.values())
+        lines.append(f"{'total':<10}{total:>10}{sum(self.errors.values()):>8}{total / elapsed:>9.1f}")
+        return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run (default: 30)")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients (default: 16)")
+    parser.add_argument('--mix', type=parse_mix, default='initiate=1,verify=2,list=4',
+                        help="Scenario weights (default: initiate=1,verify=2,list=4)")
+    parser.add_argument('--seed', type=int, help="Seed for payload and scenario choice")
+    args = parser.parse_args(argv)
+
+    driver = Driver(args.base_url)
+    elapsed = driver.run(args.mix, args.duration, args.concurrency, args.seed)
+    print(driver.report(elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Stub for every third-party API the app calls, with configurable latency and errors.
+
+    python -m loadtest.stub_server --port 8089 \
+        --latency initialize=lognormal:150:0.4 --latency verify=uniform:50:200 \
+        --error-rate initialize=0.01
+
+Point the app at it with:
+
+    URL=http://127.0.0.1:8089/transaction/initialize
+    VERIFY_URL=http://127.0.0.1:8089/transaction/verify
+    CONVERSION_URL=http://127.0.0.1:8089/v6
+    EXCHANGE_RATE_SECONDARY_URL=http://127.0.0.1:8089/open/v6/latest
+    GEOIP_LOOKUP_URL=http://127.0.0.1:8089/ipapi
+
+Latency specs (milliseconds): fixed:MS, uniform:LO:HI, normal:MEAN:SD, lognormal:MEDIAN:SIGMA.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROUTES = ('initialize', 'verify', 'pair', 'latest', 'secondary', 'ipapi')
+
+# Units of each currency per USD, close enough to real rates for load shaping
+RATES_PER_USD = {
+    'USD': 1.0, 'NGN': 1535.0, 'GBP': 0.79, 'EUR': 0.92, 'ZAR': 18.4,
+    'GHS': 15.2, 'KES': 129.0, 'XAF': 603.0,
+}
+
+COUNTRIES = ('NG', 'NG', 'NG', 'US', 'GB', 'GH', 'KE', 'ZA')
+
+
+def parse_latency(spec):
+    """Turn 'lognormal:150:0.4' into a callable returning a delay in seconds."""
+    kind, *args = spec.split(':')
+    args = [float(a) for a in args]
+    samplers = {
+        'fixed': lambda ms: lambda: ms,
+        'uniform': lambda lo, hi: lambda: random.uniform(lo, hi),
+        'normal': lambda mean, sd: lambda: max(0.0, random.gauss(mean, sd)),
+        'lognormal': lambda median, sigma: lambda: random.lognormvariate(math.log(median), sigma),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution '{kind}'")
+    sample = samplers[kind](*args)
+    return lambda: sample() / 1000
+
+
+def parse_assignments(values, parse):
+    """['verify=uniform:5:20', ...] -> {'verify': parse('uniform:5:20')}; 'all=' applies everywhere."""
+    result = {}
+    for value in values or ():
+        route, _, spec = value.partition('=')
+        if route != 'all' and route not in ROUTES:
+            raise ValueError(f"Unknown route '{route}' (expected one of: all, {', '.join(ROUTES)})")
+        for name in (ROUTES if route == 'all' else (route,)):
+            result[name] = parse(spec)
+    return result
+
+
+class StubState:
+    """Latency/error configuration plus the transactions initialized so far."""
+
+    def __init__(self, latency=None, error_rate=None, seed=None):
+        self.latency = latency or {}
+        self.error_rate = error_rate or {}
+        self.transactions = {}
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+
+    def delay(self, route):
+        sample = self.latency.get(route)
+        if sample:
+            time.sleep(sample())
+
+    def should_fail(self, route):
+        rate = self.error_rate.get(route, 0.0)
+        with self.lock:
+            return rate and self.random.random() < rate
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real APIs
+    state = None  # set by make_server()
+
+    routes = (
+        ('POST', re.compile(r'^/transaction/initialize/?$'), 'initialize'),
+        ('GET', re.compile(r'^/transaction/verify/(?P<reference>[^/]+)/?$'), 'verify'),
+        ('GET', re.compile(r'^/v6/[^/]+/pair/(?P<base>[A-Z]{3})/(?P<quote>[A-Z]{3})/?$'), 'pair'),
+        ('GET', re.compile(r'^/v6/[^/]+/latest/(?P<base>[A-Z]{3})/?$'), 'latest'),
+        ('GET', re.compile(r'^/open/v6/latest/(?P<base>[A-Z]{3})/?$'), 'secondary'),
+        ('GET', re.compile(r'^/ipapi/(?P<ip>[^/]+)/json/?$'), 'ipapi'),
+    )
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate the stub's CPU time
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def dispatch(self, method):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        for route_method, pattern, route in self.routes:
+            match = pattern.match(self.path)
+            if route_method == method and match:
+                self.state.delay(route)
+                if self.state.should_fail(route):
+                    return self.send_json(503, {"status": False, "message": "Stubbed upstream error"})
+                return getattr(self, f'handle_{route}')(body, **match.groupdict())
+        self.send_json(404, {"status": False, "message": "Not found"})
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_initialize(self, body):
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            return self.send_json(400, {"status": False, "message": "Invalid JSON"})
+        if not payload.get('email') or not payload.get('amount'):
+            return self.send_json(400, {"status": False, "message": "Email and amount are required"})
+        reference = payload.get('reference') or uuid.uuid4().hex
+        with self.state.lock:
+            self.state.transactions[reference] = int(payload['amount'])
+        self.send_json(200, {
+            "status": True,
+            "message": "Authorization URL created",
+            "data": {
+                "authorization_url": f"https://checkout.paystack.com/{reference[:16]}",
+                "access_code": reference[:16],
+                "reference": reference,
+            },
+        })
+
+    def handle_verify(self, body, reference):
+        with self.state.lock:
+            amount = self.state.transactions.get(reference)
+        if amount is None:
+            return self.send_json(400, {"status": False, "message": "Transaction reference not found"})
+        self.send_json(200, {
+            "status": True,
+            "message": "Verification successful",
+            "data": {"status": "success", "reference": reference, "amount": amount, "currency": "NGN"},
+        })
+
+    def handle_pair(self, body, base, quote):
+        if base not in RATES_PER_USD or quote not in RATES_PER_USD:
+            return self.send_json(404, {"result": "error", "error-type": "unsupported-code"})
+        self.send_json(200, {
+            "result": "success", "base_code": base, "target_code": quote,
+            "conversion_rate": round(RATES_PER_USD[quote] / RATES_PER_USD[base], 6),
+        })
+
+    def handle_latest(self, body, base):
+        if base not in RATES_PER_USD:
+            return self.send_json(404, {"result": "error", "error-type": "unsupported-code"})
+        self.send_json(200, {
+            "result": "success", "base_code": base,
+            "conversion_rates": {
+                code: round(rate / RATES_PER_USD[base], 6) for code, rate in RATES_PER_USD.items()
+            },
+        })
+
+    def handle_secondary(self, body, base):
+        if base not in RATES_PER_USD:
+            return self.send_json(404, {"result": "error", "error-type": "unsupported-code"})
+        self.send_json(200, {
+            "result": "success", "base_code": base,
+            "rates": {code: round(rate / RATES_PER_USD[base], 6) for code, rate in RATES_PER_USD.items()},
+        })
+
+    def handle_ipapi(self, body, ip):
+        self.send_json(200, {"ip": ip, "country": COUNTRIES[zlib.crc32(ip.encode()) % len(COUNTRIES)]})
+
+
+def make_server(host='127.0.0.1', port=8089, state=None):
+    """A ThreadingHTTPServer serving the stub; port 0 picks a free port."""
+    handler = type('BoundStubHandler', (StubHandler,), {'state': state or StubState()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', action='append', metavar='ROUTE=SPEC',
+                        help=f"Latency per route ({', '.join(ROUTES)} or all); repeatable")
+    parser.add_argument('--error-rate', action='append', metavar='ROUTE=FRACTION',
+                        help="Fraction of requests answered with 503; repeatable")
+    parser.add_argument('--seed', type=int, help="Seed for error injection")
+    args = parser.parse_args(argv)
+
+    try:
+        state = StubState(
+            latency=parse_assignments(args.latency, parse_latency),
+            error_rate=parse_assignments(args.error_rate, float),
+            seed=args.seed,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    server = make_server(args.host, args.port, state)
+    print(f"Stub APIs listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
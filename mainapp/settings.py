@@ -37,6 +37,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'payments.middleware.MetricsMiddleware',  # outermost, so it times the whole stack
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",  # for static files
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -127,3 +128,80 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Exchange rates
+# Seconds a live rate is served from memory, and how much longer it may be served
+# stale while a background refresh runs.
+EXCHANGE_RATE_CACHE_TTL = int(os.getenv('EXCHANGE_RATE_CACHE_TTL', '300'))
+EXCHANGE_RATE_STALE_TTL = int(os.getenv('EXCHANGE_RATE_STALE_TTL', '3600'))
+# Currency the "latest" rate table is quoted in; NGN rates are crossed from it.
+EXCHANGE_RATE_TABLE_BASE = os.getenv('EXCHANGE_RATE_TABLE_BASE', 'USD')
+# Keyless provider tried when the primary (CONVERSION_URL) is down or tripped.
+EXCHANGE_RATE_SECONDARY_URL = os.getenv('EXCHANGE_RATE_SECONDARY_URL', 'https://open.er-api.com/v6/latest')
+# Total seconds spent on one provider, and the hedge delay used until its p95 is known
+# (never hedging sooner than the minimum).
+EXCHANGE_RATE_TIMEOUT = float(os.getenv('EXCHANGE_RATE_TIMEOUT', '2'))
+EXCHANGE_RATE_HEDGE_DELAY = float(os.getenv('EXCHANGE_RATE_HEDGE_DELAY', '0.3'))
+EXCHANGE_RATE_HEDGE_MIN_DELAY = float(os.getenv('EXCHANGE_RATE_HEDGE_MIN_DELAY', '0.05'))
+EXCHANGE_RATE_WORKERS = int(os.getenv('EXCHANGE_RATE_WORKERS', '8'))
+# A provider's breaker opens when this share of recent calls failed or took longer than
+# the slow-call threshold, and stays open for the cooldown (seconds).
+EXCHANGE_RATE_BREAKER_FAILURE_RATE = float(os.getenv('EXCHANGE_RATE_BREAKER_FAILURE_RATE', '0.5'))
+EXCHANGE_RATE_BREAKER_SLOW_SECONDS = float(os.getenv('EXCHANGE_RATE_BREAKER_SLOW_SECONDS', '1'))
+EXCHANGE_RATE_BREAKER_COOLDOWN = float(os.getenv('EXCHANGE_RATE_BREAKER_COOLDOWN', '30'))
+
+# Paystack gateway client
+# Split connect/read timeouts (seconds), connection pool sizing and retry budget.
+PAYSTACK_CONNECT_TIMEOUT = float(os.getenv('PAYSTACK_CONNECT_TIMEOUT', '3.05'))
+PAYSTACK_READ_TIMEOUT = float(os.getenv('PAYSTACK_READ_TIMEOUT', '10'))
+PAYSTACK_POOL_CONNECTIONS = int(os.getenv('PAYSTACK_POOL_CONNECTIONS', '4'))
+PAYSTACK_POOL_MAXSIZE = int(os.getenv('PAYSTACK_POOL_MAXSIZE', '20'))
+PAYSTACK_MAX_RETRIES = int(os.getenv('PAYSTACK_MAX_RETRIES', '2'))
+# Ceiling on Paystack calls per second for batch jobs (keep under the account quota)
+PAYSTACK_RATE_LIMIT = float(os.getenv('PAYSTACK_RATE_LIMIT', '10'))
+# Seconds a verify result is reused for the same reference (covers frontends polling
+# from several tabs), and how many references are remembered per process.
+PAYSTACK_VERIFY_CACHE_TTL = float(os.getenv('PAYSTACK_VERIFY_CACHE_TTL', '5'))
+PAYSTACK_VERIFY_CACHE_SIZE = int(os.getenv('PAYSTACK_VERIFY_CACHE_SIZE', '10000'))
+
+# Geo-IP
+# Country index built by `manage.py build_geoip_index`; ipapi.co is only used when it is missing.
+GEOIP_INDEX_PATH = os.getenv('GEOIP_INDEX_PATH', str(BASE_DIR / 'payments' / 'data' / 'geoip_index.json'))
+GEOIP_CACHE_SIZE = int(os.getenv('GEOIP_CACHE_SIZE', '4096'))
+GEOIP_LOOKUP_URL = os.getenv('GEOIP_LOOKUP_URL', 'https://ipapi.co')
+
+# Countries (ISO 3166 with aliases), gateway currencies and allowed email domains
+PAYMENTS_REGISTRY_PATH = os.getenv('PAYMENTS_REGISTRY_PATH', str(BASE_DIR / 'payments' / 'data' / 'registry.json'))
+
+# Payments list
+PAYMENTS_PAGE_SIZE = int(os.getenv('PAYMENTS_PAGE_SIZE', '50'))
+PAYMENTS_MAX_PAGE_SIZE = int(os.getenv('PAYMENTS_MAX_PAGE_SIZE', '500'))
+
+# Seconds a payment's serialized representation stays in the default cache (CACHES)
+# once read; saving the payment drops it sooner. Use a shared cache across workers.
+PAYMENTS_READ_CACHE_TTL = int(os.getenv('PAYMENTS_READ_CACHE_TTL', '300'))
+
+# Bulk initiation: items per request and concurrent Paystack calls per request
+PAYMENTS_BULK_MAX_ITEMS = int(os.getenv('PAYMENTS_BULK_MAX_ITEMS', '500'))
+PAYMENTS_BULK_WORKERS = int(os.getenv('PAYMENTS_BULK_WORKERS', '16'))
+
+# Django admin: result sets the PostgreSQL planner estimates above this many rows are
+# not counted exactly, and bulk actions work through selections in chunks of this size.
+PAYMENTS_ADMIN_EXACT_COUNT_LIMIT = int(os.getenv('PAYMENTS_ADMIN_EXACT_COUNT_LIMIT', '10000'))
+PAYMENTS_ADMIN_CHUNK_SIZE = int(os.getenv('PAYMENTS_ADMIN_CHUNK_SIZE', '500'))
+# Most pending payments the re-verify action checks inside one admin request; larger
+# selections are refused and left to the verify_pending command.
+PAYMENTS_ADMIN_REVERIFY_LIMIT = int(os.getenv('PAYMENTS_ADMIN_REVERIFY_LIMIT', '50'))
+
+# Rows fetched per round trip when streaming exports
+PAYMENTS_EXPORT_CHUNK_SIZE = int(os.getenv('PAYMENTS_EXPORT_CHUNK_SIZE', '2000'))
+
+# Idempotency-Key handling on payment initiation
+# How long stored responses are replayed, how long a duplicate waits on the
+# first request, and how often it re-checks (seconds).
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', '86400'))
+# Seconds an unfinished claim is held before a retry may take it over (the worker died
+# mid-request); keep it above the slowest initiation, Paystack retries included.
+IDEMPOTENCY_LEASE_TTL = int(os.getenv('IDEMPOTENCY_LEASE_TTL', '60'))
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', '30'))
+IDEMPOTENCY_POLL_INTERVAL = float(os.getenv('IDEMPOTENCY_POLL_INTERVAL', '0.05'))
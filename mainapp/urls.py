@@ -17,9 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from payments import views
+from payments.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.home),
     path('api/v1/', include('payments.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class PaymentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'payments'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from . import conditional, geoip, stats
+        from .models import Payment
+
+        # Load the offline geo-IP index once per process
+        geoip.load_index()
+        # Keep the daily rollup in step with Payment.save()
+        post_save.connect(stats.track_payment_save, sender=Payment, dispatch_uid='payments.stats')
+        # Drop cached read representations when a payment is written
+        post_save.connect(conditional.invalidate, sender=Payment, dispatch_uid='payments.conditional.save')
+        post_delete.connect(conditional.invalidate, sender=Payment, dispatch_uid='payments.conditional.delete')
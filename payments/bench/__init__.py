@@ -0,0 +1,10 @@
+"""
+Microbenchmarks for the request hot paths, run with `manage.py bench`.
+
+Every case runs against mocked gateway and exchange-rate calls, so results only
+reflect local work (validation, conversion, serialization).
+"""
+from .cases import CASES
+from .runner import compare, load_baseline, measure, save_baseline
+
+__all__ = ['CASES', 'compare', 'load_baseline', 'measure', 'save_baseline']
@@ -0,0 +1,178 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import Mock, patch
+
+from django.utils import timezone
+from rest_framework import serializers
+
+from payments.conversions import clear_rate_cache, get_live_exchange_rate
+from payments.formatting import row_formatter
+from payments.gateway import PaystackClient
+from payments.models import Payment
+from payments.money import to_minor
+from payments.registry import registry
+from payments.serializers import PaymentListSerializer, PaymentSerializer
+from payments.services import new_payment, request_initialization
+
+# name -> (context manager yielding a callable, operations per call)
+CASES = {}
+
+BATCH = 200
+# The countries payments were first taken from; keeps the workload stable as the registry grows
+COUNTRIES = [registry.by_code(code) for code in ('NG', 'US', 'GB', 'ZA', 'EU', 'GH', 'KE', 'CM')]
+
+
+def case(name, ops=BATCH):
+    def register(func):
+        CASES[name] = (contextmanager(func), ops)
+        return func
+    return register
+
+
+def payloads(n=BATCH, seed=42):
+    """Initiation bodies shaped like production traffic, including some invalid ones."""
+    rng = random.Random(seed)
+    countries = [c.name.title() for c in COUNTRIES] + [c.code for c in COUNTRIES] + ['']
+    domains = ['gmail.com'] * 6 + ['yahoo.com'] * 3 + ['company.com', 'hotmail.com']
+    return [
+        {
+            'name': f'Customer {i}',
+            'email': f'customer{i}@{rng.choice(domains)}',
+            'phone_number': rng.choice(['080', '070', '+234', '0']) + str(rng.randrange(10 ** 7, 10 ** 9)),
+            'amount': f'{rng.uniform(1, 50000):.2f}',
+            'country': rng.choice(countries),
+            'state': 'Lagos',
+        }
+        for i in range(n)
+    ]
+
+
+def mocked_rates():
+    return patch('payments.serializers.get_exchange_rate', return_value=(Decimal('1535.250000'), 'live'))
+
+
+def mocked_paystack():
+    response = Mock(
+        status_code=200,
+        json=lambda: {"status": True, "data": {"authorization_url": "https://checkout.paystack.com/x"}},
+    )
+    return patch('payments.gateway.requests.Session.post', return_value=response)
+
+
+def sample_payments(n=BATCH):
+    now = timezone.now()
+    return [
+        Payment(
+            id=i, name=f'Customer {i}', email=f'customer{i}@gmail.com', phone_number='08012345678',
+            amount=Decimal(i % 5000) + Decimal('0.5'), amount_received=Decimal(i) * 1535 if i % 3 else None,
+            currency='USD', state='Lagos', country='UNITED STATES', reference=f'{i:032x}',
+            status=('pending', 'successful', 'failed')[i % 3], created_at=now - timedelta(minutes=i),
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+@case('validate_email')
+def validate_email():
+    serializer = PaymentSerializer()
+    emails = [p['email'] for p in payloads()]
+
+    def run():
+        for email in emails:
+            try:
+                serializer.validate_email(email)
+            except serializers.ValidationError:
+                pass
+    yield run
+
+
+@case('validate_phone_number')
+def validate_phone_number():
+    serializer = PaymentSerializer()
+    phones = [p['phone_number'] for p in payloads()]
+
+    def run():
+        for phone in phones:
+            try:
+                serializer.validate_phone_number(phone)
+            except serializers.ValidationError:
+                pass
+    yield run
+
+
+@case('validate')
+def validate():
+    serializer = PaymentSerializer(context={'detected_country': 'US'})
+    attrs = [dict(p, amount_minor=to_minor(Decimal(p.pop('amount')))) for p in payloads()]
+
+    def run():
+        for item in attrs:
+            try:
+                serializer.validate(dict(item))
+            except serializers.ValidationError:
+                pass
+    with mocked_rates():
+        yield run
+
+
+@case('is_valid')
+def is_valid():
+    items = payloads()
+
+    def run():
+        for item in items:
+            PaymentSerializer(data=item, context={'detected_country': 'US'}).is_valid()
+    with mocked_rates():
+        yield run
+
+
+@case('exchange_rate')
+def exchange_rate():
+    currencies = [c.currency for c in COUNTRIES] * (BATCH // len(COUNTRIES))
+    table = {currency: Decimal('1535') / (i + 1) for i, currency in enumerate(currencies)}
+    clear_rate_cache()
+
+    def run():
+        for currency in currencies:
+            get_live_exchange_rate(to_currency='NGN', from_currency=currency)
+    with patch('payments.conversions._fetch_rate_table', return_value=table):
+        yield run
+    clear_rate_cache()
+
+
+@case('request_initialization')
+def initialization():
+    client = PaystackClient(secret_key='sk_bench', initialize_url='https://paystack.invalid/initialize')
+    payments = []
+    for item in payloads():
+        amount_minor = to_minor(Decimal(item.pop('amount')))
+        item = dict(item, amount_minor=amount_minor, currency='USD', country='UNITED STATES')
+        item.update(exchange_rate=Decimal('1535'), rate_source='live', amount_ngn_minor=amount_minor * 1535)
+        payments.append(new_payment(item))
+
+    def run():
+        for payment in payments:
+            request_initialization(payment, client)
+    with mocked_paystack():
+        yield run
+
+
+@case('list_serializer')
+def list_serializer():
+    payments = sample_payments()
+
+    def run():
+        return PaymentListSerializer(payments, many=True).data
+    yield run
+
+
+@case('list_values')
+def list_values():
+    formatter = row_formatter(PaymentListSerializer)
+    rows = [{source: getattr(p, source) for source in formatter.sources} for p in sample_payments()]
+
+    def run():
+        return [formatter.format(row) for row in rows]
+    yield run
@@ -0,0 +1,109 @@
+import gc
+import json
+import time
+import tracemalloc
+from decimal import Decimal
+
+# Fixed interpreter-bound work timed next to every case. Throughput is compared as a
+# multiple of it, so a baseline recorded on one machine still applies on another.
+REFERENCE_OPS = 200
+
+
+def _reference():
+    rows = [{'id': i, 'name': f'row {i % 37}', 'amount': Decimal(i).scaleb(-2)} for i in range(REFERENCE_OPS)]
+    rows.sort(key=lambda row: (row['name'], -row['id']))
+    json.dumps([[row['id'], row['name'], str(row['amount'])] for row in rows])
+
+
+def _throughput(run, ops, min_time, repeat):
+    best = 0.0
+    for _ in range(repeat):
+        # As timeit does: cyclic GC passes land at random points and swamp the timing
+        gc.collect()
+        gc.disable()
+        try:
+            loops = 0
+            started = time.perf_counter()
+            while True:
+                run()
+                loops += 1
+                elapsed = time.perf_counter() - started
+                if elapsed >= min_time:
+                    break
+        finally:
+            gc.enable()
+        best = max(best, loops * ops / elapsed)
+    return best
+
+
+def _peak_allocation(run, samples):
+    """Smallest tracemalloc peak above the starting footprint over `samples` calls."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+    finally:
+        tracemalloc.stop()
+    # A single call's peak swings with cache refills and GC timing; the minimum doesn't
+    return min(peaks)
+
+
+def measure(setup, ops, min_time=0.5, repeat=3, samples=5):
+    """
+    Time the callable yielded by `setup` and return {'ops_per_sec', 'relative', 'peak_bytes_per_op'}.
+    Throughput is the best of `repeat` windows of at least `min_time` seconds each;
+    'relative' divides it by the reference workload's best throughput, timed the same
+    way just before and just after. Allocations are the smallest tracemalloc peak of `samples` extra
+    calls, divided by `ops`.
+    """
+    reference = _throughput(_reference, REFERENCE_OPS, min_time, repeat)
+    with setup() as run:
+        run()  # warm caches and lazy imports
+        best = _throughput(run, ops, min_time, repeat)
+        peak = _peak_allocation(run, samples)
+    reference = max(reference, _throughput(_reference, REFERENCE_OPS, min_time, repeat))
+
+    return {
+        'ops_per_sec': round(best, 1),
+        'relative': float(f'{best / reference:.4g}'),
+        'peak_bytes_per_op': round(peak / ops, 1),
+    }
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(result, baseline, threshold):
+    """
+    Return a list of regression messages for one case: throughput relative to the
+    reference workload below, or allocations above, the baseline by more than
+    `threshold` (a fraction, e.g. 0.2 for 20%). Absolute ops/sec are not compared;
+    they depend on the machine.
+    """
+    problems = []
+    if not baseline:
+        return problems
+    if 'relative' in baseline and result['relative'] < baseline['relative'] * (1 - threshold):
+        problems.append(f"throughput {result['relative']:.4g}x reference < baseline {baseline['relative']:.4g}x")
+    if result['peak_bytes_per_op'] > baseline['peak_bytes_per_op'] * (1 + threshold):
+        problems.append(
+            f"peak bytes/op {result['peak_bytes_per_op']:,.0f} > baseline {baseline['peak_bytes_per_op']:,.0f}"
+        )
+    return problems
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """A load in progress for one key; followers wait on `done`."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with stale-while-revalidate and single-flight loads.
+
+    - Entries younger than `ttl` are served as-is.
+    - Entries older than `ttl` but younger than `ttl + stale_ttl` are served
+      immediately while one background thread refreshes them.
+    - Missing (or fully expired) entries are loaded by exactly one caller;
+      concurrent callers for the same key wait for that result.
+
+    A loader signals failure by returning None. Failures are never stored, so
+    the last good value keeps being served until a load succeeds.
+
+    With `max_entries`, each store also drops expired entries and, past the
+    limit, the oldest ones.
+    """
+
+    def __init__(self, ttl, stale_ttl=0, clock=time.monotonic, max_entries=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, stored_at), oldest first
+        self._flights = {}   # key -> _Flight
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = self._clock() - stored_at
+                if age < self.ttl:
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    if key not in self._flights:
+                        self._flights[key] = _Flight()
+                        threading.Thread(
+                            target=self._load, args=(key, loader), daemon=True
+                        ).start()
+                    return value
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if leader:
+            return self._load(key, loader)
+
+        flight.done.wait()
+        return flight.value
+
+    def _load(self, key, loader):
+        try:
+            value = loader()
+        except Exception:
+            value = None
+
+        with self._lock:
+            flight = self._flights.pop(key, None)
+            if value is not None:
+                self._store(key, value)
+            else:
+                entry = self._entries.get(key)
+                value = entry[0] if entry else None
+            if flight is not None:
+                flight.value = value
+                flight.done.set()
+        return value
+
+    def _store(self, key, value):
+        # Caller holds the lock
+        now = self._clock()
+        self._entries[key] = (value, now)
+        self._entries.move_to_end(key)
+        if self.max_entries is None:
+            return
+        expiry = self.ttl + self.stale_ttl
+        while self._entries:
+            _, stored_at = next(iter(self._entries.values()))
+            if len(self._entries) <= self.max_entries and now - stored_at < expiry:
+                break
+            self._entries.popitem(last=False)
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
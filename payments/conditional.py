@@ -0,0 +1,74 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .formatting import row_formatter
+from .models import Payment
+
+
+def payment_etag(pk, version):
+    return f'"{pk}.{version}"'
+
+
+def page_etag(rows, *links):
+    """ETag for a list page: changes when any row, its version, or the page links change."""
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(f"{row['id']}.{row['version']};".encode())
+    for link in links:
+        digest.update(f"{link or ''};".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def not_modified(request, etag, last_modified=None):
+    """A 304 response when the client's If-None-Match / If-Modified-Since still hold, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag, last_modified=None):
+    """Attach ETag/Last-Modified and ask clients to revalidate before reusing the body."""
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _cache_key(pk):
+    return f'payments:payment:{pk}'
+
+
+def representations(rows, serializer_class):
+    """
+    Serialized payments for `rows` (dicts with 'id', 'version' and 'updated_at'), in order.
+    Each payment's representation is cached until it is saved again; entries whose
+    version no longer matches (e.g. after a QuerySet.update()) are rebuilt from
+    `.values()` rows by the serializer-free RowFormatter.
+    """
+    cached = cache.get_many([_cache_key(row['id']) for row in rows])
+    found = {}
+    for row in rows:
+        entry = cached.get(_cache_key(row['id']))
+        if entry is not None and entry[0] == (row['version'], row['updated_at']):
+            found[row['id']] = entry[1]
+
+    missing = [row['id'] for row in rows if row['id'] not in found]
+    if missing:
+        formatter = row_formatter(serializer_class)
+        columns = dict.fromkeys(['id', 'version', 'updated_at', *formatter.sources])
+        fresh = {}
+        for payment in Payment.objects.filter(pk__in=missing).values(*columns):
+            found[payment['id']] = formatter.format(payment)
+            fresh[_cache_key(payment['id'])] = ((payment['version'], payment['updated_at']), found[payment['id']])
+        cache.set_many(fresh, settings.PAYMENTS_READ_CACHE_TTL)
+
+    return [found[row['id']] for row in rows if row['id'] in found]
+
+
+def invalidate(sender, instance, **kwargs):
+    """post_save/post_delete receiver dropping a payment's cached representation."""
+    cache.delete(_cache_key(instance.pk))
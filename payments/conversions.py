@@ -1,27 +1,254 @@
 import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 import os
+from django.conf import settings
 from dotenv import load_dotenv
 
+from .caching import TTLCache
+from .metrics import upstream_call
+from .resilience import CircuitBreaker, LatencyWindow, hedged_call
+
 load_dotenv()
 
-def get_live_exchange_rate(to_currency='NGN', from_currency='USD'):
+# Last-resort rates for conversion to NGN when no rate provider answers
+CURRENCY_RATES_TO_NGN = {
+    'NGN': Decimal('1'),
+    'USD': Decimal('1535'),
+    'GBP': Decimal('1020'),
+    'ZAR': Decimal('55'),
+    'EUR': Decimal('900'),
+    'GHS': Decimal('100'),
+    'KES': Decimal('7'),
+    'XAF': Decimal('2.78'),
+}
+
+# Live rates keyed by (from_currency, to_currency), shared by every thread in the process
+_rate_cache = TTLCache(
+    ttl=settings.EXCHANGE_RATE_CACHE_TTL,
+    stale_ttl=settings.EXCHANGE_RATE_STALE_TTL,
+)
+
+# (table, source) pairs keyed by the quote currency, where table is {currency: rate}
+_table_cache = TTLCache(
+    ttl=settings.EXCHANGE_RATE_CACHE_TTL,
+    stale_ttl=settings.EXCHANGE_RATE_STALE_TTL,
+)
+
+# Threads running provider calls, so a slow attempt can be hedged and abandoned
+_executor = ThreadPoolExecutor(max_workers=settings.EXCHANGE_RATE_WORKERS, thread_name_prefix='exchange-rate')
+
+
+def _fetch_pair_rate(from_currency, to_currency):
     """
-    Fetch live conversion rate from `from_currency` to `to_currency`.
-    Uses exchangerate-api.com free endpoint.
+    Fetch one conversion rate from exchangerate-api.com.
+    Returns None when the API is unreachable or reports an error.
     """
     api_key = os.getenv('EXCHANGE_RATE_API_KEY')  # store your key in .env
     url = f"{os.getenv('CONVERSION_URL')}/{api_key}/pair/{from_currency}/{to_currency}"
 
-    try:
-        response = requests.get(url, timeout=5)
-        data = response.json()
-        if data['result'] == 'success':
-            print(Decimal(str(data['conversion_rate'])))
+    with upstream_call('exchange_rate', 'pair') as call:
+        try:
+            response = requests.get(url, timeout=settings.EXCHANGE_RATE_TIMEOUT)
+            data = response.json()
+        except requests.RequestException as e:
+            call.fail(type(e).__name__)
+            return None
+
+        if data.get('result') == 'success':
             return Decimal(str(data['conversion_rate']))
-        else:
-            # fallback
-            return Decimal('1')
-    except requests.RequestException:
+        call.fail('api_error')
+    return None
+
+
+def _cross(rates, to_currency):
+    """{currency: units per base} -> {currency: rate to `to_currency`}, or None."""
+    rates = {code: Decimal(str(value)) for code, value in rates.items()}
+    quote = rates.get(to_currency)
+    if not quote:
+        return None
+    # rates[X] is "X per base", so one X buys quote / rates[X] of `to_currency`
+    return {code: quote / value for code, value in rates.items() if value}
+
+
+def _fetch_rate_table(to_currency):
+    """
+    Fetch every rate in one exchangerate-api.com "latest" request and precompute
+    {currency: rate to `to_currency`}. The table is quoted against EXCHANGE_RATE_TABLE_BASE
+    and crossed locally. Returns None when the API is unreachable or reports an error.
+    """
+    api_key = os.getenv('EXCHANGE_RATE_API_KEY')
+    base = settings.EXCHANGE_RATE_TABLE_BASE
+    url = f"{os.getenv('CONVERSION_URL')}/{api_key}/latest/{base}"
+
+    with upstream_call('exchange_rate', 'latest') as call:
+        try:
+            response = requests.get(url, timeout=settings.EXCHANGE_RATE_TIMEOUT)
+            data = response.json()
+        except requests.RequestException as e:
+            call.fail(type(e).__name__)
+            return None
+        if data.get('result') != 'success':
+            call.fail('api_error')
+            return None
+
+    return _cross(data.get('conversion_rates', {}), to_currency)
+
+
+def _fetch_secondary_table(to_currency):
+    """
+    Same as _fetch_rate_table(), from the keyless open.er-api.com endpoint
+    (EXCHANGE_RATE_SECONDARY_URL), which answers with a `rates` object.
+    """
+    url = f"{settings.EXCHANGE_RATE_SECONDARY_URL}/{settings.EXCHANGE_RATE_TABLE_BASE}"
+
+    with upstream_call('exchange_rate_secondary', 'latest') as call:
+        try:
+            response = requests.get(url, timeout=settings.EXCHANGE_RATE_TIMEOUT)
+            data = response.json()
+        except requests.RequestException as e:
+            call.fail(type(e).__name__)
+            return None
+        if data.get('result') != 'success':
+            call.fail('api_error')
+            return None
+
+    return _cross(data.get('rates', {}), to_currency)
+
+
+class RateProvider:
+    """
+    One source of rate tables behind a circuit breaker. Calls are hedged: if an attempt
+    is slower than the provider's recent p95 latency, a second one is started and the
+    first answer wins, so one slow response doesn't set the caller's latency.
+    """
+
+    def __init__(self, source, fetch):
+        self.source = source
+        self.fetch = fetch
+        self.breaker = CircuitBreaker(
+            failure_rate=settings.EXCHANGE_RATE_BREAKER_FAILURE_RATE,
+            slow_call_seconds=settings.EXCHANGE_RATE_BREAKER_SLOW_SECONDS,
+            cooldown=settings.EXCHANGE_RATE_BREAKER_COOLDOWN,
+        )
+        self.latency = LatencyWindow()
+
+    def hedge_delay(self):
+        p95 = self.latency.percentile(0.95)
+        if p95 is None:
+            return settings.EXCHANGE_RATE_HEDGE_DELAY
+        return max(settings.EXCHANGE_RATE_HEDGE_MIN_DELAY, p95)
+
+    def _attempt(self, to_currency):
+        started = time.monotonic()
+        try:
+            table = self.fetch(to_currency)
+        except Exception:
+            table = None
+        elapsed = time.monotonic() - started
+        self.breaker.record(table is not None, elapsed)
+        if table is not None:
+            self.latency.add(elapsed)
+        return table
 
+    def get_table(self, to_currency):
+        """The table from this provider, or None if it failed, timed out or is tripped."""
+        if not self.breaker.allow():
+            return None
+        return hedged_call(
+            _executor, lambda: self._attempt(to_currency),
+            hedge_delay=self.hedge_delay(), timeout=settings.EXCHANGE_RATE_TIMEOUT,
+        )
+
+    def reset(self):
+        self.breaker.reset()
+        self.latency.clear()
+
+
+# get_exchange_rate() default: look the NGN rate table up (cache, then providers)
+_FETCH = object()
+
+# Tried in order; the static CURRENCY_RATES_TO_NGN table comes after these
+PROVIDERS = [
+    RateProvider('live', lambda to_currency: _fetch_rate_table(to_currency)),
+    RateProvider('secondary', lambda to_currency: _fetch_secondary_table(to_currency)),
+]
+
+
+def _load_table(to_currency):
+    for provider in PROVIDERS:
+        table = provider.get_table(to_currency)
+        if table is not None:
+            return table, provider.source
+    return None
+
+
+def get_rate_table_entry(to_currency='NGN'):
+    """
+    Return the cached ({currency: Decimal rate to `to_currency`}, source) from the first
+    provider that answers, or None if none is available.
+    """
+    return _table_cache.get_or_load(to_currency, lambda: _load_table(to_currency))
+
+
+def get_rate_table(to_currency='NGN'):
+    """The table from get_rate_table_entry() without its source, or None."""
+    entry = get_rate_table_entry(to_currency)
+    return entry[0] if entry else None
+
+
+def get_live_exchange_rate(to_currency='NGN', from_currency='USD'):
+    """
+    Fetch live conversion rate from `from_currency` to `to_currency`.
+    Uses exchangerate-api.com free endpoint.
+
+    Conversions into NGN are read from the rate table, so every currency shares one
+    request per refresh; other pairs use the per-pair endpoint. Results are cached for
+    EXCHANGE_RATE_CACHE_TTL seconds and served stale for up to EXCHANGE_RATE_STALE_TTL
+    more while a single background refresh runs.
+
+    Returns None when no live rate is available, so callers can fall back to their own table.
+    """
+    if from_currency == to_currency:
         return Decimal('1')
+
+    if to_currency == 'NGN':
+        table = get_rate_table(to_currency)
+        return table.get(from_currency) if table else None
+
+    return _rate_cache.get_or_load(
+        (from_currency, to_currency),
+        lambda: _fetch_pair_rate(from_currency, to_currency),
+    )
+
+
+def get_exchange_rate(from_currency, to_currency='NGN', table_entry=_FETCH):
+    """
+    Rate from `from_currency` to `to_currency` as (rate, source), walking the chain:
+    primary API ('live'), secondary API ('secondary'), then CURRENCY_RATES_TO_NGN
+    ('fallback'). Same-currency pairs are (1, 'identity') without a lookup.
+    Pass `table_entry` (from get_rate_table_entry(), None included) to reuse an NGN
+    table fetched earlier instead of asking the providers again.
+    Returns (None, None) when no source has the pair.
+    """
+    if from_currency == to_currency:
+        return Decimal('1'), 'identity'
+
+    if to_currency == 'NGN':
+        entry = get_rate_table_entry(to_currency) if table_entry is _FETCH else table_entry
+        if entry and from_currency in entry[0]:
+            return entry[0][from_currency], entry[1]
+        if from_currency in CURRENCY_RATES_TO_NGN:
+            return CURRENCY_RATES_TO_NGN[from_currency], 'fallback'
+        return None, None
+
+    rate = get_live_exchange_rate(to_currency=to_currency, from_currency=from_currency)
+    return (rate, 'live') if rate is not None else (None, None)
+
+
+def clear_rate_cache():
+    _rate_cache.clear()
+    _table_cache.clear()
+    for provider in PROVIDERS:
+        provider.reset()
@@ -0,0 +1,102 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import STATUS, Payment
+from .money import format_minor
+
+EXPORT_FIELDS = (
+    'id', 'reference', 'name', 'email', 'phone_number',
+    'amount', 'currency', 'amount_ngn', 'exchange_rate', 'rate_source', 'amount_received',
+    'country', 'state', 'status', 'created_at',
+)
+
+# Money columns are read as integer minor units and written as decimal strings
+_MINOR_SOURCES = {
+    'amount': 'amount_minor',
+    'amount_ngn': 'amount_ngn_minor',
+    'amount_received': 'amount_received_minor',
+}
+_SOURCES = tuple(_MINOR_SOURCES.get(field, field) for field in EXPORT_FIELDS)
+_MONEY_COLUMNS = [i for i, field in enumerate(EXPORT_FIELDS) if field in _MINOR_SOURCES]
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def parse_filters(start=None, end=None, status=None):
+    """
+    Turn raw `start`/`end` (YYYY-MM-DD, both inclusive) and `status` values into
+    queryset filters. Raises ValueError with a user-facing message on bad input.
+    """
+    filters = {}
+    for name, value, offset, lookup in (
+        ('start', start, 0, 'created_at__gte'),
+        ('end', end, 1, 'created_at__lt'),
+    ):
+        if not value:
+            continue
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"'{name}' must be a date in YYYY-MM-DD format.")
+        filters[lookup] = timezone.make_aware(datetime.combine(day + timedelta(days=offset), time.min))
+
+    if status:
+        if status not in dict(STATUS):
+            raise ValueError(f"'status' must be one of: {', '.join(dict(STATUS))}.")
+        filters['status'] = status
+    return filters
+
+
+def export_rows(filters, chunk_size=None):
+    """Stream matching payments as lists in EXPORT_FIELDS order, oldest first."""
+    return queryset_rows(Payment.objects.filter(**filters), chunk_size)
+
+
+def queryset_rows(queryset, chunk_size=None):
+    """Stream the payments in `queryset` as lists in EXPORT_FIELDS order, oldest first."""
+    rows = (
+        queryset
+        .order_by('created_at', 'id')
+        .values_list(*_SOURCES)
+        .iterator(chunk_size=chunk_size or settings.PAYMENTS_EXPORT_CHUNK_SIZE)
+    )
+    for row in rows:
+        row = list(row)
+        for i in _MONEY_COLUMNS:
+            if row[i] is not None:
+                row[i] = format_minor(row[i])
+        yield row
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_export(fmt, rows):
+    """Encode `rows` lazily in the given format, one line per yielded string."""
+    if fmt == 'csv':
+        return iter_csv(rows)
+    return iter_ndjson(rows)
@@ -0,0 +1,28 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
+from rest_framework import serializers
+
+from .money import MINOR_EXPONENT, format_minor, to_minor
+
+
+class MinorUnitsField(serializers.DecimalField):
+    """
+    Decimal amount on the wire ("1234.50"), integer minor units on the model.
+    `min_value`/`max_value` are given in major units, like on DecimalField.
+    """
+
+    def __init__(self, max_digits=14, decimal_places=MINOR_EXPONENT, **kwargs):
+        min_value = kwargs.pop('min_value', None)
+        max_value = kwargs.pop('max_value', None)
+        super().__init__(max_digits=max_digits, decimal_places=decimal_places, **kwargs)
+        if min_value is not None:
+            message = self.error_messages['min_value'].format(min_value=min_value)
+            self.validators.append(MinValueValidator(to_minor(min_value), message=message))
+        if max_value is not None:
+            message = self.error_messages['max_value'].format(max_value=max_value)
+            self.validators.append(MaxValueValidator(to_minor(max_value), message=message))
+
+    def to_internal_value(self, data):
+        return to_minor(super().to_internal_value(data))
+
+    def to_representation(self, value):
+        return format_minor(value)
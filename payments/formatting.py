@@ -0,0 +1,84 @@
+import decimal
+from functools import lru_cache
+
+from rest_framework import fields as drf_fields
+from rest_framework.settings import api_settings
+
+from .fields import MinorUnitsField
+from .money import format_minor
+
+# DRF fields whose to_representation() is the identity for the values the ORM returns
+_PASSTHROUGH = (drf_fields.CharField, drf_fields.IntegerField, drf_fields.ChoiceField)
+
+
+def _decimal(field):
+    if (
+        not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        or field.localize or field.normalize_output or field.decimal_places is None
+    ):
+        return field.to_representation
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        return f'{value.quantize(exponent, rounding=rounding, context=context):f}'
+    return convert
+
+
+def _datetime(field):
+    if getattr(field, 'format', api_settings.DATETIME_FORMAT).lower() != drf_fields.ISO_8601:
+        return field.to_representation
+    enforce_timezone = field.enforce_timezone
+
+    def convert(value):
+        value = enforce_timezone(value).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _converter(field):
+    if isinstance(field, MinorUnitsField):
+        return format_minor
+    if isinstance(field, drf_fields.DecimalField):
+        return _decimal(field)
+    if isinstance(field, drf_fields.DateTimeField):
+        return _datetime(field)
+    if isinstance(field, drf_fields.ChoiceField):
+        # Choice keys that are strings come back unchanged
+        if all(key == str(key) for key in field.choices):
+            return None
+        return field.to_representation
+    if isinstance(field, _PASSTHROUGH):
+        return None
+    return field.to_representation
+
+
+class RowFormatter:
+    """
+    Formats `.values()` rows into the same dicts `serializer_class(instance).data` holds,
+    without building model instances or walking DRF fields per row.
+    Only flat model-field serializers are supported.
+    """
+
+    def __init__(self, serializer_class):
+        self.columns = []
+        for name, field in serializer_class().fields.items():
+            if len(field.source_attrs) != 1:
+                raise ValueError(f"{serializer_class.__name__}.{name} is not a plain model field.")
+            self.columns.append((name, field.source, _converter(field)))
+        self.sources = [source for _, source, _ in self.columns]
+
+    def format(self, row):
+        data = {}
+        for name, source, convert in self.columns:
+            value = row[source]
+            data[name] = value if value is None or convert is None else convert(value)
+        return data
+
+
+@lru_cache(maxsize=None)
+def row_formatter(serializer_class):
+    return RowFormatter(serializer_class)
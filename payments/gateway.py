@@ -0,0 +1,133 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+import requests
+from django.conf import settings
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from .metrics import upstream_call
+
+load_dotenv()  # Load environment variables from a .env file if present
+
+
+class GatewayError(Exception):
+    """Paystack could not be reached or did not accept the request."""
+
+
+class PaystackClient:
+    """
+    Paystack API client built on one pooled, keep-alive session.
+
+    Connections are reused across requests (up to PAYSTACK_POOL_MAXSIZE per host),
+    auth headers are built once, and every call uses split connect/read timeouts.
+    Connection failures are retried for every method since nothing reached Paystack;
+    read failures and 429/5xx responses are only retried for idempotent GETs.
+    Retries back off exponentially with jitter.
+    """
+
+    def __init__(self, secret_key=None, initialize_url=None, verify_url=None):
+        self.secret_key = secret_key or os.getenv('TEST_SECRET_KEY')
+        self.initialize_url = initialize_url or os.getenv('URL')
+        self.verify_url = verify_url or os.getenv('VERIFY_URL')
+        self.timeout = (settings.PAYSTACK_CONNECT_TIMEOUT, settings.PAYSTACK_READ_TIMEOUT)
+        self.session = self._build_session()
+
+    def _build_session(self):
+        retry = Retry(
+            total=settings.PAYSTACK_MAX_RETRIES,
+            backoff_factor=0.2,
+            backoff_jitter=0.2,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({'GET'}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=settings.PAYSTACK_POOL_CONNECTIONS,
+            pool_maxsize=settings.PAYSTACK_POOL_MAXSIZE,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Authorization': f'Bearer {self.secret_key}',
+            'Content-Type': 'application/json',
+        })
+        return session
+
+    def _parse(self, response, failure_message):
+        try:
+            response_data = response.json()
+        except ValueError:
+            raise GatewayError(failure_message)
+        if response.status_code != 200 or not response_data.get('status'):
+            raise GatewayError(response_data.get('message') or failure_message)
+        return response_data.get('data') or {}
+
+    def verify_signature(self, body, signature):
+        """Check a webhook's X-Paystack-Signature (HMAC-SHA512 of the raw body)."""
+        if not self.secret_key or not signature:
+            return False
+        expected = hmac.new(self.secret_key.encode(), body, hashlib.sha512).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    def initialize_transaction(self, payload):
+        """Initialize a transaction and return Paystack's `data` object."""
+        with upstream_call('paystack', 'initialize') as call:
+            try:
+                response = self.session.post(self.initialize_url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                call.fail(type(e).__name__)
+                raise GatewayError(f"Error communicating with payment gateway: {str(e)}")
+            if response.status_code != 200:
+                call.fail(f'http_{response.status_code}')
+            return self._parse(response, 'Failed to initialize transaction with Paystack.')
+
+    def verify_transaction(self, reference):
+        """Verify a transaction by reference and return Paystack's `data` object."""
+        with upstream_call('paystack', 'verify') as call:
+            try:
+                response = self.session.get(f"{self.verify_url}/{reference}", timeout=self.timeout)
+            except requests.RequestException as e:
+                call.fail(type(e).__name__)
+                raise GatewayError(f"Error communicating with payment gateway: {str(e)}")
+            if response.status_code != 200:
+                call.fail(f'http_{response.status_code}')
+            return self._parse(response, 'Failed to verify transaction with Paystack.')
+
+
+class RateLimiter:
+    """
+    Spaces out calls to at most `rate` per second across all threads sharing it.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_paystack_client():
+    """Return the process-wide Paystack client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PaystackClient()
+    return _client
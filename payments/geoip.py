@@ -0,0 +1,116 @@
+import bisect
+import csv
+import ipaddress
+import json
+import os
+import threading
+from array import array
+from functools import lru_cache
+
+from django.conf import settings
+
+
+class GeoIPIndex:
+    """
+    In-memory country lookup over sorted, non-overlapping IP ranges.
+
+    IPv4 ranges live in compact unsigned integer arrays; IPv6 ranges use plain
+    int lists since they don't fit in a machine word. Lookups bisect on the
+    range starts, so they cost O(log n) with no I/O.
+    """
+
+    def __init__(self, v4_ranges, v6_ranges):
+        v4_ranges = sorted(v4_ranges)
+        v6_ranges = sorted(v6_ranges)
+        self._v4_starts = array('I', (r[0] for r in v4_ranges))
+        self._v4_ends = array('I', (r[1] for r in v4_ranges))
+        self._v4_countries = [r[2] for r in v4_ranges]
+        self._v6_starts = [r[0] for r in v6_ranges]
+        self._v6_ends = [r[1] for r in v6_ranges]
+        self._v6_countries = [r[2] for r in v6_ranges]
+
+    def __len__(self):
+        return len(self._v4_countries) + len(self._v6_countries)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Build from a `start_ip,end_ip,country_code` CSV (e.g. the DB-IP country lite file)."""
+        v4, v6 = [], []
+        with open(path, newline='') as f:
+            for row in csv.reader(f):
+                if len(row) < 3 or row[0].startswith('#'):
+                    continue
+                try:
+                    start = ipaddress.ip_address(row[0].strip())
+                    end = ipaddress.ip_address(row[1].strip())
+                except ValueError:
+                    continue  # header or malformed line
+                country = row[2].strip().upper()
+                if start.version != end.version or not country:
+                    continue
+                (v4 if start.version == 4 else v6).append((int(start), int(end), country))
+        return cls(v4, v6)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data['v4'], data['v6'])
+
+    def save(self, path):
+        data = {
+            'v4': list(zip(self._v4_starts, self._v4_ends, self._v4_countries)),
+            'v6': list(zip(self._v6_starts, self._v6_ends, self._v6_countries)),
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+    def lookup(self, ip):
+        """Return the ISO country code for `ip`, or None if it is not covered."""
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if addr.version == 6 and addr.ipv4_mapped:
+            addr = addr.ipv4_mapped
+
+        n = int(addr)
+        if addr.version == 4:
+            starts, ends, countries = self._v4_starts, self._v4_ends, self._v4_countries
+        else:
+            starts, ends, countries = self._v6_starts, self._v6_ends, self._v6_countries
+
+        i = bisect.bisect_right(starts, n) - 1
+        if i >= 0 and n <= ends[i]:
+            return countries[i]
+        return None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def load_index(path=None):
+    """
+    Load the index file once per process. Returns False when no index file exists.
+    """
+    global _index
+    path = path or settings.GEOIP_INDEX_PATH
+    with _index_lock:
+        if not os.path.exists(path):
+            return False
+        _index = GeoIPIndex.load(path)
+        lookup_country.cache_clear()
+    return True
+
+
+def has_index():
+    return _index is not None
+
+
+@lru_cache(maxsize=settings.GEOIP_CACHE_SIZE)
+def lookup_country(ip):
+    """Country code for a client IP from the local index, or None."""
+    if _index is None:
+        return None
+    return _index.lookup(ip)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+class IdempotencyConflict(Exception):
+    """The key belongs to a different request, or its first request is still running."""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def fingerprint(data):
+    """Stable hash of a request body, used to detect a key reused for a different request."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _lease_end(now):
+    return now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_TTL)
+
+
+def claim(key, request_hash):
+    """
+    Claim `key` for the current request.
+
+    Returns (record, True) when the caller should run the request and then call
+    complete() or release(), or (record, False) with a stored response to replay.
+    A request already running under the same key is waited on (polling the row, so
+    it works across workers) for up to IDEMPOTENCY_WAIT_TIMEOUT seconds.
+    An unfinished claim whose lease (IDEMPOTENCY_LEASE_TTL) has run out belongs to a
+    worker that died mid-request and is taken over. Expired responses are evicted.
+    """
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    while True:
+        record = IdempotencyKey.objects.filter(key=key).first()
+        now = timezone.now()
+        if record is not None and record.status_code is not None and record.expires_at <= now:
+            IdempotencyKey.objects.filter(pk=record.pk, expires_at__lte=now).delete()
+            record = None
+
+        if record is None:
+            lease = _lease_end(now)
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        key=key, request_hash=request_hash, locked_until=lease, expires_at=lease,
+                    )
+                return record, True
+            except IntegrityError:
+                continue  # a concurrent request claimed it first; wait on that one
+
+        if record.request_hash != request_hash:
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request.", 422)
+        if record.status_code is not None:
+            return record, False
+        if record.locked_until is None or record.locked_until <= now:
+            # Conditional on the lease we saw, so only one retry takes the claim over
+            lease = _lease_end(now)
+            taken = IdempotencyKey.objects.filter(
+                pk=record.pk, status_code__isnull=True, locked_until=record.locked_until,
+            ).update(locked_until=lease, expires_at=lease)
+            if taken:
+                record.locked_until = record.expires_at = lease
+                return record, True
+            continue
+        if time.monotonic() >= deadline:
+            raise IdempotencyConflict("A request with this Idempotency-Key is still in progress.", 409)
+        time.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+
+def _held(record):
+    """The claim `record`, as long as no other request has taken it over."""
+    return IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True, locked_until=record.locked_until)
+
+
+def complete(record, status_code, body):
+    """Store the response for replay for IDEMPOTENCY_KEY_TTL seconds."""
+    _held(record).update(
+        status_code=status_code, response_body=body, locked_until=None,
+        expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+    )
+
+
+def release(record):
+    """Drop an unfinished claim so the client can retry with the same key."""
+    _held(record).delete()
+
+
+def run(key, data, handler):
+    """
+    Run `handler()`, which returns (status code, body), at most once per Idempotency-Key.
+
+    Without a key the handler just runs. A retry with the same key and body gets the
+    stored response back instead. Only successful responses are stored; an error status
+    or an exception frees the key so the client can retry.
+    Returns (status code, body, extra response headers).
+    """
+    if not key:
+        return (*handler(), {})
+    if len(key) > MAX_KEY_LENGTH:
+        return 400, {"detail": "Idempotency-Key is too long."}, {}
+
+    try:
+        record, owner = claim(key, fingerprint(data))
+    except IdempotencyConflict as e:
+        return e.status_code, {"detail": str(e)}, {}
+    if not owner:
+        # Replay the first response without touching the gateway
+        return record.status_code, record.response_body, {'Idempotent-Replayed': 'true'}
+
+    try:
+        status_code, body = handler()
+    except Exception:
+        release(record)
+        raise
+    if status_code < 400:
+        complete(record, status_code, body)
+    else:
+        release(record)
+    return status_code, body, {}
+
+
+def purge_expired(batch_size=1000):
+    """Delete expired keys in batches; returns the number removed."""
+    removed = 0
+    while True:
+        pks = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return removed
+        removed += IdempotencyKey.objects.filter(pk__in=pks).delete()[0]
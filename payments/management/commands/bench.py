@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.bench import CASES, compare, load_baseline, measure, save_baseline
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / 'bench' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the hot-path microbenchmarks (mocked gateway and rates), compare them with the "
+        "stored baseline and exit non-zero on a regression."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('cases', nargs='*', help=f"Cases to run (default: all of {', '.join(CASES)})")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="Baseline JSON file")
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help="Allowed slowdown / allocation growth as a fraction of the baseline (default: 0.25)",
+        )
+        parser.add_argument('--min-time', type=float, default=0.5, help="Seconds per timing window (default: 0.5)")
+        parser.add_argument('--repeat', type=int, default=3, help="Timing windows per case (default: 3)")
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help="Write these results to the baseline file instead of comparing",
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['cases']) - set(CASES)
+        if unknown:
+            raise CommandError(f"Unknown cases: {', '.join(sorted(unknown))}")
+        names = options['cases'] or list(CASES)
+        baseline = load_baseline(options['baseline'])
+
+        results, regressions = {}, {}
+        # ops/sec is informational; the check uses throughput as a multiple of the reference workload
+        self.stdout.write(f"{'case':<24}{'ops/sec':>14}{'x ref':>10}{'baseline':>10}{'change':>9}{'peak B/op':>12}")
+        for name in names:
+            setup, ops = CASES[name]
+            result = results[name] = measure(setup, ops, options['min_time'], options['repeat'])
+            expected = (baseline.get(name) or {}).get('relative')
+            change = f"{result['relative'] / expected - 1:+.0%}" if expected else '-'
+            self.stdout.write(
+                f"{name:<24}{result['ops_per_sec']:>14,.0f}{result['relative']:>10.4g}"
+                f"{expected or 0:>10.4g}{change:>9}{result['peak_bytes_per_op']:>12,.0f}"
+            )
+            if not options['save_baseline']:
+                problems = compare(result, baseline.get(name), options['threshold'])
+                if problems:
+                    regressions[name] = problems
+
+        if options['save_baseline']:
+            save_baseline(options['baseline'], {**baseline, **results})
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline for {len(results)} cases to {options['baseline']}"))
+            return
+
+        if regressions:
+            for name, problems in regressions.items():
+                self.stderr.write(f"{name}: {'; '.join(problems)}")
+            raise CommandError(f"{len(regressions)} benchmark(s) regressed beyond {options['threshold']:.0%}")
+        self.stdout.write(self.style.SUCCESS("No regressions"))
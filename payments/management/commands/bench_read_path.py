@@ -0,0 +1,72 @@
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from payments.formatting import row_formatter
+from payments.models import Payment
+from payments.serializers import PaymentListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows/sec of the ModelSerializer read path against the .values() fast path. "
+        "Sample rows are inserted in a transaction that is rolled back, so this only runs with "
+        "DEBUG on or --allow-writes; exits non-zero if the two paths render different output."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help="Sample payments to insert (default: 5000)")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per path; the best is kept (default: 5)")
+        parser.add_argument(
+            '--allow-writes', action='store_true',
+            help="Run with DEBUG off; the insert still advances id sequences and holds a write transaction",
+        )
+
+    def handle(self, *args, **options):
+        if not (settings.DEBUG or options['allow_writes']):
+            raise CommandError(
+                "Refusing to insert sample rows into a database with DEBUG off; "
+                "point DATABASE_URL at a scratch database and pass --allow-writes."
+            )
+        rows, repeat = options['rows'], options['repeat']
+        formatter = row_formatter(PaymentListSerializer)
+        renderer = JSONRenderer()
+
+        def serializer_path():
+            return renderer.render(PaymentListSerializer(Payment.objects.all(), many=True).data)
+
+        def values_path():
+            return renderer.render([formatter.format(row) for row in Payment.objects.values(*formatter.sources)])
+
+        with transaction.atomic():
+            Payment.objects.bulk_create([
+                Payment(
+                    name=f'Payer {i}', email='bench@gmail.com', phone_number='08012345678',
+                    amount=Decimal(i % 10000) / 4, amount_received=Decimal(i) * 15,
+                    currency='USD', state='Lagos', country='NG',
+                )
+                for i in range(rows)
+            ], batch_size=1000)
+
+            results = {}
+            for name, path in (('serializer', serializer_path), ('values', values_path)):
+                best = min(self.time_once(path) for _ in range(repeat))
+                results[name] = rows / best
+                self.stdout.write(f"{name:>10}: {results[name]:,.0f} rows/s")
+            matches = serializer_path() == values_path()
+            transaction.set_rollback(True)
+
+        if not matches:
+            raise CommandError("The serializer and .values() paths render different output.")
+
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {results['values'] / results['serializer']:.1f}x"))
+
+    @staticmethod
+    def time_once(path):
+        started = time.perf_counter()
+        path()
+        return time.perf_counter() - started
@@ -0,0 +1,36 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.geoip import GeoIPIndex
+
+
+class Command(BaseCommand):
+    help = "Rebuild the offline geo-IP country index from a start_ip,end_ip,country_code CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help="CSV of IP ranges, e.g. dbip-country-lite.csv")
+        parser.add_argument(
+            '--output',
+            default=settings.GEOIP_INDEX_PATH,
+            help="Where to write the index (default: GEOIP_INDEX_PATH)",
+        )
+
+    def handle(self, *args, **options):
+        csv_path = options['csv_path']
+        output = options['output']
+        if not os.path.exists(csv_path):
+            raise CommandError(f"CSV file '{csv_path}' does not exist.")
+
+        index = GeoIPIndex.from_csv(csv_path)
+        if not len(index):
+            raise CommandError(f"No IP ranges found in '{csv_path}'.")
+
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        # Write beside the target, then swap, so running workers never read a partial file
+        tmp_path = f"{output}.tmp"
+        index.save(tmp_path)
+        os.replace(tmp_path, output)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(index)} ranges to {output}"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.export import EXPORT_FORMATS, export_rows, iter_export, parse_filters
+
+
+class Command(BaseCommand):
+    help = "Stream payments as CSV or NDJSON with constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--start', help="First day to include (YYYY-MM-DD)")
+        parser.add_argument('--end', help="Last day to include (YYYY-MM-DD)")
+        parser.add_argument('--status', help="Only export payments with this status")
+        parser.add_argument('--chunk-size', type=int, help="Rows fetched per query (default: PAYMENTS_EXPORT_CHUNK_SIZE)")
+        parser.add_argument('--output', help="File to write to (default: stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_filters(options['start'], options['end'], options['status'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        lines = iter_export(options['format'], export_rows(filters, options['chunk_size']))
+        if options['output']:
+            with open(options['output'], 'w', newline='') as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from payments.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses whose TTL has passed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows deleted per query (default: 1000)")
+
+    def handle(self, *args, **options):
+        removed = purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} expired idempotency keys"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from payments.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily payment rollup from the Payment table (all days, or a date range)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day to rebuild, YYYY-MM-DD (inclusive)")
+        parser.add_argument('--end', help="Last day to rebuild, YYYY-MM-DD (inclusive)")
+
+    def handle(self, *args, **options):
+        days = {}
+        for name in ('start', 'end'):
+            if options[name]:
+                days[name] = parse_date(options[name])
+                if days[name] is None:
+                    raise CommandError(f"--{name} must be a date in YYYY-MM-DD format.")
+        written = rebuild(**days)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} daily stats rows"))
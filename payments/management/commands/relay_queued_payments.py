@@ -0,0 +1,67 @@
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments.gateway import RateLimiter, get_paystack_client
+from payments.models import Payment
+from payments.services import record_initialization, request_initialization
+
+REJECTED = {'gateway_state': 'rejected', 'status': 'failed'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Settle payments left 'queued' by a process that died between inserting the row and "
+        "recording Paystack's answer: reject them, or re-initialize them with their stored reference."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=10,
+            help="Only relay payments queued at least this many minutes ago (default: 10)",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Rows fetched per batch (default: 500)",
+        )
+        parser.add_argument(
+            '--reinitialize', action='store_true',
+            help="Initialize with Paystack again (same reference) and only reject what Paystack refuses",
+        )
+        parser.add_argument(
+            '--rate', type=float, default=settings.PAYSTACK_RATE_LIMIT,
+            help="Maximum Paystack requests per second with --reinitialize (default: PAYSTACK_RATE_LIMIT)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        queued = (
+            Payment.objects
+            .filter(gateway_state='queued', created_at__lte=cutoff)
+            .order_by('created_at')
+            .iterator(chunk_size=batch_size)
+        )
+        client = get_paystack_client() if options['reinitialize'] else None
+        limiter = RateLimiter(options['rate'])
+
+        counts = {'initialized': 0, 'rejected': 0, 'skipped': 0}
+        while batch := list(islice(queued, batch_size)):
+            for payment in batch:
+                fields = REJECTED
+                if client is not None:
+                    limiter.acquire()
+                    fields, _, _ = request_initialization(payment, client)
+                # Conditional on 'queued', so a late answer from the original request wins
+                if record_initialization(payment, dict(fields)):
+                    counts[fields['gateway_state']] += 1
+                else:
+                    counts['skipped'] += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Relayed {sum(counts.values())} queued payments: {counts['initialized']} initialized, "
+            f"{counts['rejected']} rejected, {counts['skipped']} already settled"
+        ))
@@ -0,0 +1,113 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from payments import stats
+from payments.gateway import GatewayError, RateLimiter, get_paystack_client
+from payments.models import VERSION_FIELDS, Payment
+from payments.services import apply_verification
+
+
+class Command(BaseCommand):
+    help = "Verify pending payments with Paystack concurrently and record the results in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=15,
+            help="Only verify payments created at least this many minutes ago (default: 15)",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Rows fetched and written back per batch (default: 500)",
+        )
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help="Concurrent Paystack requests (default: 8)",
+        )
+        parser.add_argument(
+            '--rate', type=float, default=settings.PAYSTACK_RATE_LIMIT,
+            help="Maximum Paystack requests per second (default: PAYSTACK_RATE_LIMIT)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        pending = (
+            Payment.objects
+            .filter(status='pending', created_at__lte=cutoff)
+            .exclude(gateway_state='queued')  # Paystack never saw these; see relay_queued_payments
+            .only(
+                'id', 'reference', 'status', 'amount_minor', 'amount_received_minor', 'currency', 'country',
+                'created_at', 'version',
+            )
+            .iterator(chunk_size=batch_size)
+        )
+
+        client = get_paystack_client()
+        limiter = RateLimiter(options['rate'])
+
+        def verify(payment):
+            old = stats.snapshot(payment)
+            limiter.acquire()
+            try:
+                data = client.verify_transaction(payment.reference)
+            except GatewayError:
+                return payment, old, None
+            return payment, old, apply_verification(payment, data)
+
+        counts = {'checked': 0, 'successful': 0, 'failed': 0, 'unchanged': 0, 'errors': 0}
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                batch = list(islice(pending, batch_size))
+                if not batch:
+                    break
+
+                changed = []
+                for payment, old, fields in executor.map(verify, batch):
+                    counts['checked'] += 1
+                    if fields is None:
+                        counts['errors'] += 1
+                    elif not fields:
+                        counts['unchanged'] += 1
+                    else:
+                        counts[payment.status] += 1
+                        changed.append((payment, old))
+
+                if changed:
+                    self.write_back(changed, batch_size)
+
+        elapsed = time.monotonic() - started
+        rate = counts['checked'] / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {counts['checked']} pending payments in {elapsed:.2f}s ({rate:.1f}/s): "
+            f"{counts['successful']} successful, {counts['failed']} failed, "
+            f"{counts['unchanged']} still in progress, {counts['errors']} errors"
+        ))
+
+    def write_back(self, changed, batch_size):
+        """
+        Write verified rows in one short transaction. Rows a webhook settled while we were
+        calling Paystack are skipped, so neither the row nor the daily rollup is double-counted.
+        """
+        with transaction.atomic():
+            still_pending = set(
+                Payment.objects.select_for_update()
+                .filter(pk__in=[payment.pk for payment, _ in changed], status='pending')
+                .values_list('pk', flat=True)
+            )
+            changed = [(payment, old) for payment, old in changed if payment.pk in still_pending]
+            for payment, _ in changed:
+                payment.touch()
+            Payment.objects.bulk_update(
+                [payment for payment, _ in changed], ['status', 'amount_received_minor', *VERSION_FIELDS],
+                batch_size=batch_size,
+            )
+            stats.record_transitions([(payment, *old) for payment, old in changed])
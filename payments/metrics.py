@@ -0,0 +1,88 @@
+"""
+Prometheus metrics for the payment API.
+
+Set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory before starting gunicorn
+so every worker writes to shared files and /metrics reports the sum over workers
+(gunicorn.conf.py cleans up after exited workers).
+"""
+import os
+import time
+
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+UPSTREAM_LATENCY = Histogram(
+    'payments_upstream_request_seconds',
+    "Latency of calls to third-party APIs.",
+    ['upstream', 'operation'],
+)
+UPSTREAM_ERRORS = Counter(
+    'payments_upstream_errors_total',
+    "Failed calls to third-party APIs, by reason (exception class, http_<status> or api_error).",
+    ['upstream', 'operation', 'reason'],
+)
+REQUEST_LATENCY = Histogram(
+    'payments_http_request_seconds',
+    "Time to produce a response, per view.",
+    ['view', 'method', 'status'],
+)
+REQUEST_DB_QUERIES = Histogram(
+    'payments_http_request_db_queries',
+    "Database queries run while handling one request, per view.",
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100, float('inf')),
+)
+REQUEST_DB_SECONDS = Histogram(
+    'payments_http_request_db_seconds',
+    "Time spent in database queries while handling one request, per view.",
+    ['view'],
+)
+
+
+class UpstreamCall:
+    """Handle yielded by upstream_call(); mark the call failed with fail(reason)."""
+
+    __slots__ = ('failed',)
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self, reason):
+        self.failed = reason
+
+
+class upstream_call:
+    """
+    Context manager timing one call to `upstream`. Exceptions escaping the block are
+    counted as errors under their class name unless fail() already gave a reason.
+    """
+
+    __slots__ = ('upstream', 'operation', 'call', 'started')
+
+    def __init__(self, upstream, operation):
+        self.upstream = upstream
+        self.operation = operation
+
+    def __enter__(self):
+        self.call = UpstreamCall()
+        self.started = time.perf_counter()
+        return self.call
+
+    def __exit__(self, exc_type, exc, tb):
+        UPSTREAM_LATENCY.labels(self.upstream, self.operation).observe(time.perf_counter() - self.started)
+        reason = self.call.failed or (exc_type.__name__ if exc_type else None)
+        if reason:
+            UPSTREAM_ERRORS.labels(self.upstream, self.operation, reason).inc()
+        return False
+
+
+def metrics_view(request):
+    """Expose every metric in the Prometheus text format."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
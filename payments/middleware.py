@@ -0,0 +1,67 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connection
+
+from .metrics import REQUEST_DB_QUERIES, REQUEST_DB_SECONDS, REQUEST_LATENCY
+
+
+class _QueryTimer:
+    """connection.execute_wrapper() hook counting queries and the time spent in them."""
+
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """
+    Record latency, and for sync views DB query count and time, per resolved view.
+    Views are labelled by URL name so label cardinality stays bounded; /metrics itself
+    is not recorded. Async views run their queries on executor threads, so only their
+    latency is recorded.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def record(request, response, elapsed, timer=None):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        if view == 'metrics':
+            return
+        REQUEST_LATENCY.labels(view, request.method, response.status_code).observe(elapsed)
+        if timer is not None:
+            REQUEST_DB_QUERIES.labels(view).observe(timer.count)
+            REQUEST_DB_SECONDS.labels(view).observe(timer.seconds)
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_alter_payment_reference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='amount_ngn',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='exchange_rate',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='rate_source',
+            field=models.CharField(blank=True, choices=[('live', 'Live'), ('fallback', 'Fallback'), ('backfill', 'Backfill')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_amount_ngn(apps, schema_editor):
+    """
+    Older rows only recorded the NGN amount in `amount_received` at initiation.
+    Copy it into `amount_ngn` and derive the rate that was applied.
+    """
+    Payment = apps.get_model('payments', 'Payment')
+    rows = (
+        Payment.objects
+        .filter(amount_ngn__isnull=True, amount_received__isnull=False)
+        .only('id', 'amount', 'amount_received')
+    )
+
+    batch = []
+    for payment in rows.iterator(chunk_size=BATCH_SIZE):
+        payment.amount_ngn = payment.amount_received
+        if payment.amount:
+            payment.exchange_rate = (payment.amount_received / payment.amount).quantize(Decimal('0.000001'))
+        payment.rate_source = 'backfill'
+        batch.append(payment)
+        if len(batch) >= BATCH_SIZE:
+            Payment.objects.bulk_update(batch, ['amount_ngn', 'exchange_rate', 'rate_source'])
+            batch = []
+    if batch:
+        Payment.objects.bulk_update(batch, ['amount_ngn', 'exchange_rate', 'rate_source'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_payment_amount_ngn_rate'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_amount_ngn, migrations.RunPython.noop),
+    ]
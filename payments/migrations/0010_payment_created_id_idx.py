@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0009_backfill_amount_ngn'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='payment',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-created_at', '-id'], name='payment_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:31
+
+import uuid
+
+import payments.models
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+BATCH_SIZE = 1000
+
+
+def clean_references(apps, schema_editor):
+    """
+    Give every row a distinct reference before the unique constraint is added.
+    Missing references get a fresh one; duplicates keep the oldest row's value
+    and later rows get an `-dup-<id>` suffix.
+    """
+    Payment = apps.get_model('payments', 'Payment')
+
+    batch = []
+    missing = Payment.objects.filter(Q(reference__isnull=True) | Q(reference='')).only('id')
+    for payment in missing.iterator(chunk_size=BATCH_SIZE):
+        payment.reference = uuid.uuid4().hex
+        batch.append(payment)
+        if len(batch) >= BATCH_SIZE:
+            Payment.objects.bulk_update(batch, ['reference'])
+            batch = []
+    if batch:
+        Payment.objects.bulk_update(batch, ['reference'])
+        batch = []
+
+    duplicated = (
+        Payment.objects.values('reference')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .values_list('reference', flat=True)
+    )
+    for reference in list(duplicated):
+        for payment in Payment.objects.filter(reference=reference).order_by('id').only('id')[1:]:
+            suffix = f"-dup-{payment.id}"
+            payment.reference = reference[:100 - len(suffix)] + suffix
+            batch.append(payment)
+            if len(batch) >= BATCH_SIZE:
+                Payment.objects.bulk_update(batch, ['reference'])
+                batch = []
+
+    if batch:
+        Payment.objects.bulk_update(batch, ['reference'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0010_payment_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(clean_references, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='payment',
+            name='reference',
+            field=models.CharField(default=payments.models.generate_reference, max_length=100, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='payment_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0011_payment_reference_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='authorization_url',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+    ]
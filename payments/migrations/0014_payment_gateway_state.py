@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0013_idempotencykey'),
+    ]
+
+    operations = [
+        # Existing rows already went through the gateway
+        migrations.AddField(
+            model_name='payment',
+            name='gateway_state',
+            field=models.CharField(choices=[('queued', 'Queued'), ('initialized', 'Initialized'), ('rejected', 'Rejected')], default='initialized', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='gateway_state',
+            field=models.CharField(choices=[('queued', 'Queued'), ('initialized', 'Initialized'), ('rejected', 'Rejected')], default='queued', max_length=20),
+        ),
+    ]
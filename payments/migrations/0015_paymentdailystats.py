@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0014_payment_gateway_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('currency', models.CharField(max_length=10)),
+                ('country', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('successful', 'Successful'), ('failed', 'Failed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('amount_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('amount_received_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+            options={
+                'ordering': ['day', 'currency', 'country', 'status'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'currency', 'country', 'status'), name='payment_daily_stats_key')],
+            },
+        ),
+    ]
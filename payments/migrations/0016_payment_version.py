@@ -0,0 +1,30 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_created_at(apps, schema_editor):
+    Payment = apps.get_model('payments', 'Payment')
+    Payment.objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0015_paymentdailystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        # Existing rows start out with updated_at = created_at
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0016_payment_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='rate_source',
+            field=models.CharField(blank=True, choices=[('live', 'Live'), ('secondary', 'Secondary provider'), ('fallback', 'Fallback'), ('backfill', 'Backfill')], max_length=20),
+        ),
+    ]
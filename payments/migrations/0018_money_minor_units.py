@@ -0,0 +1,105 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# (model, {decimal field: minor-units field})
+MONEY_FIELDS = (
+    ('Payment', {
+        'amount': 'amount_minor',
+        'amount_received': 'amount_received_minor',
+        'amount_ngn': 'amount_ngn_minor',
+    }),
+    ('PaymentDailyStats', {
+        'amount_sum': 'amount_minor_sum',
+        'amount_received_sum': 'amount_received_minor_sum',
+    }),
+)
+
+
+def _to_minor(value):
+    if value is None:
+        return None
+    return int((value * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def _to_decimal(value):
+    if value is None:
+        return None
+    return Decimal(value).scaleb(-2)
+
+
+def _copy(apps, convert, forward):
+    for model_name, fields in MONEY_FIELDS:
+        Model = apps.get_model('payments', model_name)
+        pairs = list(fields.items()) if forward else [(new, old) for old, new in fields.items()]
+        sources = [source for source, _ in pairs]
+        targets = [target for _, target in pairs]
+
+        batch = []
+        for row in Model.objects.only('id', *sources).iterator(chunk_size=BATCH_SIZE):
+            for source, target in pairs:
+                setattr(row, target, convert(getattr(row, source)))
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                Model.objects.bulk_update(batch, targets)
+                batch = []
+        if batch:
+            Model.objects.bulk_update(batch, targets)
+
+
+def decimal_to_minor(apps, schema_editor):
+    _copy(apps, _to_minor, forward=True)
+
+
+def minor_to_decimal(apps, schema_editor):
+    _copy(apps, _to_decimal, forward=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0017_payment_rate_source_secondary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='amount_minor',
+            field=models.BigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='amount_received_minor',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='amount_ngn_minor',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentdailystats',
+            name='amount_minor_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='paymentdailystats',
+            name='amount_received_minor_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+        # Nullable while both columns exist, so reversing can re-add it empty before filling it
+        migrations.AlterField(
+            model_name='payment',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.RunPython(decimal_to_minor, minor_to_decimal),
+        migrations.RemoveField(model_name='payment', name='amount'),
+        migrations.RemoveField(model_name='payment', name='amount_received'),
+        migrations.RemoveField(model_name='payment', name='amount_ngn'),
+        migrations.RemoveField(model_name='paymentdailystats', name='amount_sum'),
+        migrations.RemoveField(model_name='paymentdailystats', name='amount_received_sum'),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0018_money_minor_units'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='payment_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['currency', '-created_at', '-id'], name='payment_currency_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['email'], name='payment_email_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0019_payment_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 00:18
+
+from django.db import migrations, models
+
+
+def relabel_same_currency(apps, schema_editor):
+    Payment = apps.get_model('payments', 'Payment')
+    Payment.objects.filter(currency='NGN', rate_source='live').update(rate_source='identity')
+
+
+def restore_live(apps, schema_editor):
+    Payment = apps.get_model('payments', 'Payment')
+    Payment.objects.filter(rate_source='identity').update(rate_source='live')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0020_idempotencykey_locked_until'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='rate_source',
+            field=models.CharField(blank=True, choices=[('live', 'Live'), ('secondary', 'Secondary provider'), ('fallback', 'Fallback'), ('backfill', 'Backfill'), ('identity', 'Same currency')], max_length=20),
+        ),
+        # NGN payments were recorded as 'live' although no rate was looked up
+        migrations.RunPython(relabel_same_currency, restore_live),
+    ]
@@ -1,32 +1,169 @@
 import uuid
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
+
+from .money import to_decimal, to_minor
 
 # Create your models here.
 
+
+def generate_reference():
+    """Locally generated Paystack reference, known before the gateway is called."""
+    return uuid.uuid4().hex
+
+
 STATUS = (
     ('pending', 'Pending'),
     ('successful', 'Successful'),
     ('failed', 'Failed'),
 )
 
+# Initiation outbox: a row is inserted 'queued' before Paystack is called and moves
+# exactly once to 'initialized' (checkout link stored) or 'rejected' (payment failed).
+GATEWAY_STATES = (
+    ('queued', 'Queued'),
+    ('initialized', 'Initialized'),
+    ('rejected', 'Rejected'),
+)
+
+RATE_SOURCES = (
+    ('live', 'Live'),
+    ('secondary', 'Secondary provider'),
+    ('fallback', 'Fallback'),
+    ('backfill', 'Backfill'),
+    ('identity', 'Same currency'),
+)
+
+
+def major_units(minor_field):
+    """Decimal view of an integer minor-units field; assigning converts back (half up)."""
+    def get(self):
+        return to_decimal(getattr(self, minor_field))
+
+    def set(self, value):
+        setattr(self, minor_field, None if value is None else to_minor(value))
+    return property(get, set)
+
+
+# Written alongside any change so cached reads and ETags notice it
+VERSION_FIELDS = ('version', 'updated_at')
+
+
+def bump_version(**fields):
+    """`fields` for QuerySet.update(), plus the version bump save() would have done."""
+    return {**fields, 'version': models.F('version') + 1, 'updated_at': timezone.now()}
+
 
 class Payment(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100)
     phone_number = models.CharField(max_length=15)
     email = models.EmailField()
-    amount = models.DecimalField(max_digits=12, decimal_places=2)
-    amount_received = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    # Money is stored as integer minor units (see payments.money): `amount` in `currency`,
+    # the other two in kobo
+    amount_minor = models.BigIntegerField()
+    amount_received_minor = models.BigIntegerField(null=True, blank=True)
+    amount_ngn_minor = models.BigIntegerField(null=True, blank=True)
+    exchange_rate = models.DecimalField(max_digits=18, decimal_places=6, null=True, blank=True)
+    rate_source = models.CharField(max_length=20, choices=RATE_SOURCES, blank=True)
     currency = models.CharField(max_length=10, default='NG')
     state = models.CharField(max_length=100)
     country = models.CharField(max_length=100)
-    reference = models.CharField(max_length=100, blank=True, null=True)
+    reference = models.CharField(max_length=100, unique=True, default=generate_reference)
+    authorization_url = models.URLField(max_length=500, blank=True)
+    gateway_state = models.CharField(max_length=20, choices=GATEWAY_STATES, default=GATEWAY_STATES[0][0])
     status = models.CharField(max_length=20, choices=STATUS, default=STATUS[0][0])
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every write; backs ETags and the cached read representation
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Backs keyset pagination and the default ordering
+            models.Index(fields=['-created_at', '-id'], name='payment_created_id_idx'),
+            # Only pending rows are ever re-verified; keep that set in a small partial index
+            models.Index(
+                fields=['created_at'], name='payment_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+            # Admin filters, read in the default order
+            models.Index(fields=['status', '-created_at', '-id'], name='payment_status_created_idx'),
+            models.Index(fields=['currency', '-created_at', '-id'], name='payment_currency_created_idx'),
+            # Admin prefix search (LIKE 'x%'); the opclass only applies on PostgreSQL
+            models.Index(fields=['email'], name='payment_email_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+    amount = major_units('amount_minor')
+    amount_received = major_units('amount_received_minor')
+    amount_ngn = major_units('amount_ngn_minor')
+
+    def __str__(self):
+        return f"Payment {self.id} - {self.status}"
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if not self._state.adding and (update_fields is None or update_fields):
+            self.version += 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *VERSION_FIELDS}
+        super().save(*args, **kwargs)
+
+    def touch(self):
+        """Bump the version by hand before a bulk_update() that includes VERSION_FIELDS."""
+        self.version += 1
+        self.updated_at = timezone.now()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so the daily rollup can apply status changes on save
+        instance._tracked = (instance.__dict__.get('status'), instance.__dict__.get('amount_received_minor'))
+        return instance
+
+
+class PaymentDailyStats(models.Model):
+    """
+    Rollup of payments per (day, currency, country, status), kept current as payments
+    are created or change status. Rebuild with `manage.py rebuild_payment_stats`.
+    """
+    day = models.DateField()
+    currency = models.CharField(max_length=10)
+    country = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS)
+    count = models.IntegerField(default=0)
+    amount_minor_sum = models.BigIntegerField(default=0)
+    amount_received_minor_sum = models.BigIntegerField(default=0)
 
     class Meta:
+        ordering = ['day', 'currency', 'country', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'currency', 'country', 'status'], name='payment_daily_stats_key'),
+        ]
+
+    amount_sum = major_units('amount_minor_sum')
+    amount_received_sum = major_units('amount_received_minor_sum')
 
-        ordering = ['-created_at']
+    def __str__(self):
+        return f"{self.day} {self.currency} {self.country} {self.status}: {self.count}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored outcome of a request made with an Idempotency-Key header.
+    A row without a status_code is a claim on a request that is still running,
+    held until `locked_until`.
+    """
+    key = models.CharField(max_length=255, unique=True)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
 
     def __str__(self):
-        return f"Payment {self.id} - {self.status}"
\ No newline at end of file
+        return f"IdempotencyKey {self.key}"
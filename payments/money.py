@@ -0,0 +1,51 @@
+"""
+Money as integer minor units.
+
+Amounts are stored and computed as ints (kobo for NGN, cents for USD, ...) with a
+fixed two-digit exponent for every currency, matching the two decimal places the
+columns always had. An amount travels as a bare int next to its currency field;
+Decimals only appear at the edges, in MinorUnitsField and `to_decimal`.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+MINOR_EXPONENT = 2
+MINOR_PER_MAJOR = 10 ** MINOR_EXPONENT
+_MINOR_QUANTUM = Decimal(1).scaleb(-MINOR_EXPONENT)
+
+# Exchange rates are applied as integer millionths (the exchange_rate column's precision)
+RATE_EXPONENT = 6
+RATE_SCALE = 10 ** RATE_EXPONENT
+RATE_QUANTUM = Decimal(1).scaleb(-RATE_EXPONENT)
+
+
+def to_minor(value):
+    """Decimal/str/int major units -> int minor units, rounding half up."""
+    if isinstance(value, int):
+        return value * MINOR_PER_MAJOR
+    return int(Decimal(value).quantize(_MINOR_QUANTUM, rounding=ROUND_HALF_UP).scaleb(MINOR_EXPONENT))
+
+
+def to_decimal(minor):
+    """int minor units -> Decimal major units with two places (None passes through)."""
+    if minor is None:
+        return None
+    return Decimal(minor).scaleb(-MINOR_EXPONENT)
+
+
+def format_minor(minor):
+    """int minor units -> '1234.50', without building a Decimal."""
+    sign = '-' if minor < 0 else ''
+    major, cents = divmod(abs(minor), MINOR_PER_MAJOR)
+    return f'{sign}{major}.{cents:0{MINOR_EXPONENT}d}'
+
+
+def rate_to_micro(rate):
+    """Decimal rate -> int millionths, rounding half up."""
+    return int(Decimal(rate).quantize(RATE_QUANTUM, rounding=ROUND_HALF_UP).scaleb(RATE_EXPONENT))
+
+
+def convert_minor(minor, rate_micro):
+    """Apply a rate in millionths to minor units, rounding half up (away from zero)."""
+    product = abs(minor) * rate_micro
+    converted = (product + RATE_SCALE // 2) // RATE_SCALE
+    return -converted if minor < 0 else converted
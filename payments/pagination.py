@@ -0,0 +1,124 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+def reverse_ordering(ordering):
+    """('-created_at', '-id') -> ('created_at', 'id'), and the other way round."""
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+class PaymentCursorPagination(CursorPagination):
+    """
+    Keyset pagination over payments, newest first.
+    The cursor holds the boundary row's (created_at, id) and pages seek past it on the
+    (created_at, id) index, so deep pages and runs of equal timestamps cost the same
+    as the first page.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = settings.PAYMENTS_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.PAYMENTS_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            _, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            created_at, pk = self._decode_position(current_position)
+            # Forward pages move to older rows, reverse pages to newer ones
+            op = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'created_at__{op}': created_at}) | Q(created_at=created_at, **{f'id__{op}': pk})
+            )
+
+        # Positions are unique, so no offset is needed; one extra row tells if there's more
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if has_following_position else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            created_at, pk = instance['created_at'], instance['id']
+        else:
+            created_at, pk = instance.created_at, instance.pk
+        return f'{created_at.isoformat()}|{pk}'
+
+    def _decode_position(self, position):
+        created_at, _, pk = position.partition('|')
+        try:
+            key = (parse_datetime(created_at), int(pk))
+        except ValueError:
+            key = (None, None)
+        if key[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return key
+
+
+def planner_estimate(queryset):
+    """Rows the PostgreSQL planner expects `queryset` to return, or None on other databases."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin paginator that takes the planner's row estimate instead of running COUNT(*)
+    when it is above PAYMENTS_ADMIN_EXACT_COUNT_LIMIT. Smaller results, and every
+    result on databases without an estimate, are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            estimate = planner_estimate(self.object_list)
+            if estimate is not None and estimate > settings.PAYMENTS_ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
@@ -0,0 +1,76 @@
+import json
+import unicodedata
+from types import MappingProxyType
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Dropped outright ("U.S.A." -> "USA"); other punctuation separates words
+_DELETE = str.maketrans('', '', ".'’")
+_SEPARATORS = str.maketrans({c: ' ' for c in '-,()/&_'})
+
+
+def normalize(value):
+    """Alias key for free-text country input: uppercase ASCII words, single-spaced."""
+    value = value.translate(_DELETE).translate(_SEPARATORS).upper()
+    if not value.isascii():
+        value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode()
+    return ' '.join(value.split())
+
+
+class Country(NamedTuple):
+    code: str       # ISO 3166-1 alpha-2, what the geo-IP index returns
+    alpha3: str
+    name: str       # stored on Payment.country
+    currency: str
+
+
+class Registry:
+    """
+    Countries, currencies and email domains from a data file, indexed once into
+    read-only dicts and frozensets so every validator lookup is a single hash probe.
+    """
+
+    def __init__(self, countries, gateway_currencies, email_domains):
+        by_code, by_alias = {}, {}
+        for entry in countries:
+            country = Country(entry['code'], entry.get('alpha3'), entry['name'], entry.get('currency'))
+            by_code[country.code] = country
+            for alias in (country.code, country.alpha3, country.name, *entry.get('aliases', ())):
+                if not alias:
+                    continue
+                key = normalize(alias)
+                if by_alias.setdefault(key, country) is not country:
+                    raise ImproperlyConfigured(
+                        f"Country alias '{alias}' maps to both {by_alias[key].code} and {country.code}."
+                    )
+
+        self.countries = MappingProxyType(by_code)
+        self._aliases = MappingProxyType(by_alias)
+        self.gateway_currencies = frozenset(gateway_currencies)
+        self.email_domains = frozenset(domain.lower() for domain in email_domains)
+        # Countries a payment can be taken from, in data-file order
+        self.payable_countries = tuple(c for c in by_code.values() if c.currency in self.gateway_currencies)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['countries'], data['gateway_currencies'], data['email_domains'])
+
+    def country(self, value):
+        """The Country for a code, alpha-3 code, name or alias, or None."""
+        return self._aliases.get(normalize(value))
+
+    def by_code(self, code):
+        return self.countries.get(code)
+
+    def is_payable(self, currency):
+        return currency in self.gateway_currencies
+
+    def allows_email(self, email):
+        return email.rpartition('@')[2].lower() in self.email_domains
+
+
+registry = Registry.load(settings.PAYMENTS_REGISTRY_PATH)
@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that keeps failing or answering slowly.
+
+    - closed: calls go through; the last `window` outcomes are kept.
+    - open: once at least `min_calls` outcomes are recorded and the share of failures,
+      or of calls slower than `slow_call_seconds`, reaches `failure_rate`, calls are
+      refused for `cooldown` seconds.
+    - half-open: after the cooldown one probe call is let through; its outcome
+      closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_rate=0.5, slow_call_seconds=1.0, cooldown=30, window=20, min_calls=5,
+                 clock=time.monotonic):
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown = cooldown
+        self.min_calls = min_calls
+        self._clock = clock
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'half-open' if self._clock() - self._opened_at >= self.cooldown else 'open'
+
+    def allow(self):
+        """True if a call may be made now (claims the probe slot when half-open)."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or self._clock() - self._opened_at < self.cooldown:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, ok, elapsed):
+        bad = not ok or elapsed >= self.slow_call_seconds
+        with self._lock:
+            if self._opened_at is not None:
+                if self._probing:
+                    self._probing = False
+                    if bad:
+                        self._opened_at = self._clock()
+                    else:
+                        self._opened_at = None
+                        self._outcomes.clear()
+                return
+            self._outcomes.append(bad)
+            if len(self._outcomes) >= self.min_calls and sum(self._outcomes) >= self.failure_rate * len(self._outcomes):
+                self._opened_at = self._clock()
+
+    def reset(self):
+        with self._lock:
+            self._outcomes.clear()
+            self._opened_at = None
+            self._probing = False
+
+
+class LatencyWindow:
+    """Rolling window of recent call latencies with a cheap percentile lookup."""
+
+    def __init__(self, size=100):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction, min_samples=20):
+        """The `fraction` percentile, or None until `min_samples` latencies are known."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+def hedged_call(executor, func, hedge_delay, timeout):
+    """
+    Run `func()` on `executor`; if it hasn't returned after `hedge_delay` seconds, start
+    an identical second call and return whichever non-None result arrives first.
+    Gives up with None after `timeout` seconds in total, leaving stragglers to finish
+    in the background. A fast None (failure) is returned as-is, not hedged.
+    """
+    deadline = time.monotonic() + timeout
+    first = executor.submit(func)
+    done, _ = wait([first], timeout=min(hedge_delay, timeout))
+    if done:
+        return first.result()
+
+    pending = {first, executor.submit(func)}
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.result() is not None:
+                return future.result()
+    return None
@@ -1,47 +1,56 @@
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import ROUND_HALF_UP
 from ipware import get_client_ip
-import os
 import requests
+from django.conf import settings
 from rest_framework import serializers
-from payments.models import Payment
+from payments.models import Payment, PaymentDailyStats
 from dotenv import load_dotenv
-from .conversions import get_live_exchange_rate
+from . import geoip
+from .conversions import get_exchange_rate
+from .fields import MinorUnitsField
+from .metrics import upstream_call
+from .money import RATE_QUANTUM, convert_minor, rate_to_micro
+from .registry import registry
+from .services import initiate_payment
 
 load_dotenv()  # Load environment variables from a .env file if present
 
-# Allowed email domains
-ALLOWED_EMAIL_DOMAINS = ('company.com', 'gmail.com', 'yahoo.com')
-
-# Country codes → currencies and names
-COUNTRY_CURRENCY = {
-    'NG': ('NGN', 'NIGERIA'),
-    'US': ('USD', 'UNITED STATES'),
-    'GB': ('GBP', 'UNITED KINGDOM'),
-    'ZA': ('ZAR', 'SOUTH AFRICA'),
-    'EU': ('EUR', 'EUROPEAN UNION'),
-    'GH': ('GHS', 'GHANA'),
-    'KE': ('KES', 'KENYA'),
-    'CM': ('XAF', 'CAMEROON'),
-}
-
-# Rates for conversion to NGN
-CURRENCY_RATES_TO_NGN = {
-    'NGN': Decimal('1'),
-    'USD': Decimal('1535'),
-    'GBP': Decimal('1020'),
-    'ZAR': Decimal('55'),
-    'EUR': Decimal('900'),
-    'GHS': Decimal('100'),
-    'KES': Decimal('7'),
-    'XAF': Decimal('2.78'),
-}
-
-PAYSTACK_SUPPORTED_CURRENCIES = set(CURRENCY_RATES_TO_NGN.keys())
+# Precomputed once: the registry is fixed for the life of the process
+EMAIL_DOMAINS_MESSAGE = f"Email must be from the domains: {', '.join(sorted(registry.email_domains))}"
+SUPPORTED_COUNTRIES = ', '.join(f"{c.currency}: {c.name}" for c in registry.payable_countries)
+
+
+def detect_country_code(request):
+    """
+    Best-effort country code for the client IP, falling back to NG.
+    Uses the offline geo-IP index; ipapi.co is only called when no index is installed.
+    """
+    ip, _ = get_client_ip(request)
+    country_code = 'NG'  # fallback
+    if not ip:
+        return country_code
+
+    if geoip.has_index():
+        code = geoip.lookup_country(ip)
+    else:
+        with upstream_call('ipapi', 'lookup') as call:
+            try:
+                resp = requests.get(f'{settings.GEOIP_LOOKUP_URL}/{ip}/json/', timeout=3).json()
+                code = (resp.get('country') or '').upper()
+            except requests.RequestException as e:
+                call.fail(type(e).__name__)
+                code = None
+
+    country = registry.by_code(code)
+    if country and registry.is_payable(country.currency):
+        country_code = code
+    return country_code
 
 
 class PaymentSerializer(serializers.ModelSerializer):
     currency = serializers.ReadOnlyField()
-    amount_ngn = serializers.SerializerMethodField(read_only=True)
+    amount = MinorUnitsField(source='amount_minor', max_digits=12, min_value=1)
+    amount_ngn = MinorUnitsField(source='amount_ngn_minor', read_only=True)
 
     class Meta:
         model = Payment
@@ -51,15 +60,17 @@ class PaymentSerializer(serializers.ModelSerializer):
             'state', 'country',
             'status', 'created_at', 'reference'
         ]
-        read_only_fields = ['status', 'created_at', 'id', 'currency', 'amount_ngn', 'reference']
-        extra_kwargs = {'amount': {'min_value': 1}}
+        read_only_fields = ['status', 'created_at', 'id', 'currency', 'reference',
+                            'exchange_rate', 'rate_source']
+        extra_kwargs = {
+            # Optional: detected from the client IP when omitted
+            'country': {'required': False, 'allow_blank': True},
+        }
 
     # ---------- Validators ----------
     def validate_email(self, value):
-        if not any(value.endswith(f"@{d}") for d in ALLOWED_EMAIL_DOMAINS):
-            raise serializers.ValidationError(
-                f"Email must be from the domains: {', '.join(ALLOWED_EMAIL_DOMAINS)}"
-            )
+        if not registry.allows_email(value):
+            raise serializers.ValidationError(EMAIL_DOMAINS_MESSAGE)
         return value
 
     def validate_phone_number(self, value):
@@ -70,154 +81,58 @@ class PaymentSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         request = self.context.get('request')
 
-        # Normalize country input
-        country_input = (attrs.get('country') or '').strip().upper()
-
-        
-
-        if country_input:
-            # Match against known country codes or names
-            match = None
-            for code, (currency, name) in COUNTRY_CURRENCY.items():
-                if country_input == code or country_input.lower() == name.lower():
-                    match = code
-                    break
-            if not match:
-                valid_countries = [f"{cur}: {name}" for cur, name in COUNTRY_CURRENCY.values()]
+        country_input = attrs.get('country') or ''
+        if country_input.strip():
+            # Code, alpha-3 code, name or known alias
+            country = registry.country(country_input)
+            # Unknown, or a territory with no currency of its own (e.g. Antarctica)
+            if country is None or country.currency is None:
                 raise serializers.ValidationError({
-                    'country': f"Payments from '{attrs.get('country')}' are not supported. Supported countries are: {', '.join(valid_countries)}"
+                    'country': f"Payments from '{country_input}' are not supported. Supported countries are: {SUPPORTED_COUNTRIES}"
                 })
-            country_code = match
         else:
-            # Try to detect via IP
-            ip, _ = get_client_ip(request)
-            country_code = 'NG'  # fallback
-            try:
-                if ip:
-                    resp = requests.get(f'https://ipapi.co/{ip}/json/', timeout=3).json()
-                    code = (resp.get('country') or '').upper()
-                    if code in COUNTRY_CURRENCY:
-                        country_code = code
-            except requests.RequestException:
-                pass
-
+            # Use a country detected ahead of validation (async views) or detect via IP
+            country = registry.by_code(self.context.get('detected_country') or detect_country_code(request))
 
-        currency, country_name = COUNTRY_CURRENCY[country_code]
-        attrs['country'] = country_name
+        currency = country.currency
+        if not registry.is_payable(currency):
+            raise serializers.ValidationError({
+                'currency': f"Currency '{currency}' is not supported."
+            })
+        attrs['country'] = country.name
         attrs['currency'] = currency
 
         # Required basics
-        for f in ['name', 'state', 'amount']:
-            if not attrs.get(f):
+        for f, key in [('name', 'name'), ('state', 'state'), ('amount', 'amount_minor')]:
+            if not attrs.get(key):
                 raise serializers.ValidationError({f: f"{f.capitalize()} is required."})
             
         
-        # --- Live conversion to NGN ---
-        amount = Decimal(attrs['amount'])
-        # Try live rate first
-        rate = get_live_exchange_rate(from_currency=currency, to_currency='NGN')
+        # --- Conversion to NGN: primary API, secondary API, then the static table ---
+        # Async views fetch the rate table ahead of validation; a failed fetch isn't retried
+        lookup = {'table_entry': self.context['rate_table']} if 'rate_table' in self.context else {}
+        rate, rate_source = get_exchange_rate(from_currency=currency, to_currency='NGN', **lookup)
         if rate is None:
-            # fallback to hardcoded rate
-            rate = CURRENCY_RATES_TO_NGN.get(currency.upper(), Decimal('1'))
-            attrs['amount_ngn'] = (amount * rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        else:
-            attrs['amount_ngn'] = amount
-        
-        attrs['amount_ngn'] = (amount * rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        return attrs
+            raise serializers.ValidationError({
+                'currency': f"No exchange rate to NGN is available for '{currency}'."
+            })
 
-   # ---------- Representation helpers ----------
-    def get_amount_ngn(self, obj):
-        try:
-            amount = Decimal(obj.amount)
-            currency = (obj.currency or 'NGN').upper()
-    
-            if currency != 'NGN':
-                # Try live rate first
-                rate = get_live_exchange_rate(from_currency=currency, to_currency='NGN')
-                if not rate:
-                    # fallback to hardcoded rate
-                    rate = CURRENCY_RATES_TO_NGN.get(currency, Decimal('1'))
-            else:
-                rate = Decimal('1')
-    
-            ngn = (amount * rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            return str(ngn)
-    
-        except Exception as e:
-            print(f"⚠️ Error in get_amount_ngn: {e}")
-            return None
+        # Apply the rate at the precision the column keeps, in integer arithmetic, so the
+        # kobo we charge are exactly amount * exchange_rate as stored and shown
+        rate = rate.quantize(RATE_QUANTUM, rounding=ROUND_HALF_UP)
+        attrs['exchange_rate'] = rate
+        attrs['rate_source'] = rate_source
+        attrs['amount_ngn_minor'] = convert_minor(attrs['amount_minor'], rate_to_micro(rate))
+        return attrs
 
     # ---------- Create ----------
     def create(self, validated_data):
-        # Create payment record
-        payment = Payment.objects.create(
-            name=validated_data['name'],
-            email=validated_data['email'],
-            phone_number=validated_data['phone_number'],
-            amount=validated_data['amount'],
-            currency=validated_data['currency'],
-            state=validated_data['state'],
-            country=validated_data['country'],
-        )
-
-        amount_ngn = Decimal(self.get_amount_ngn(payment))
-
-        if payment.currency not in PAYSTACK_SUPPORTED_CURRENCIES:
-            payment.status = 'failed'
-            raise serializers.ValidationError({
-                'currency': f"Currency '{payment.currency}' is not supported."
-            })
-
-        # Call Paystack initialize endpoint
-        headers = {
-            'Authorization': f'Bearer {os.getenv("TEST_SECRET_KEY")}',
-            'Content-Type': 'application/json',
-        }
-        payload = {
-            'email': payment.email,
-            'amount': int(amount_ngn * 100),  # in kobo
-            'reference': payment.reference,
-            'currency': 'NGN',  # Paystack only accepts NGN for now
-            'callback_url': f'https://payment-repos.onrender.com/api/v1/payment/verify/',  # Replace with your actual callback URL
-            'metadata': {
-                'name': payment.name,
-                'phone_number': payment.phone_number,
-                'original_amount': str(payment.amount),
-                'original_currency': payment.currency,
-                'country': payment.country,
-                'state': payment.state,
-            }
-        }
-        try:
-            response = requests.post(
-                os.getenv('URL'),
-                json=payload,
-                headers=headers,
-                timeout=10
-            )
-            response_data = response.json()
-            if response.status_code != 200 or not response_data.get('status'):
-                raise Exception(response_data.get('message', 'Failed to initialize transaction with Paystack.'))
-
-            auth_url = response_data['data'].get('authorization_url')
-            if not auth_url:
-                raise Exception("No authorization URL returned from Paystack.")
-
-            # Store authorization URL for later use
-            self._authorization_url = auth_url
-
-            paystack_data = response_data['data']
-            paystack_ref = paystack_data.get('reference')
-            payment.reference = paystack_ref
-            payment.amount_received = amount_ngn
-            payment.save()
-
-        except requests.RequestException as e:
-            raise serializers.ValidationError(f"Error communicating with payment gateway: {str(e)}")
-        except Exception as e:
-            raise serializers.ValidationError(str(e))
+        payment, auth_url, error = initiate_payment(validated_data)
+        if error:
+            raise serializers.ValidationError(error)
 
+        # Store authorization URL for later use
+        self._authorization_url = auth_url
         return payment
 
 
@@ -226,6 +141,8 @@ class PaymentVerificationSerializer(serializers.ModelSerializer):
         model = Payment
         fields = ['reference', 'status']
         read_only_fields = ['status']
+        # Looks up existing references, so the model's uniqueness check doesn't apply
+        extra_kwargs = {'reference': {'validators': []}}
 
 
     def validate_reference(self, value):
@@ -234,9 +151,20 @@ class PaymentVerificationSerializer(serializers.ModelSerializer):
         return value
 
 class PaymentListSerializer(serializers.ModelSerializer):
+    amount = MinorUnitsField(source='amount_minor', max_digits=12, read_only=True)
+    amount_received = MinorUnitsField(source='amount_received_minor', max_digits=12, read_only=True)
+
     class Meta:
         model = Payment
         fields = ['id', 'name', 'country', 'state', 'reference', 'status', 'amount', 'amount_received', 'created_at']
-        read_only_fields = ['id', 'name', 'country', 'state', 'reference', 'status', 'amount_received', 'created_at']
+        read_only_fields = ['id', 'name', 'country', 'state', 'reference', 'status', 'created_at']
+
 
+class PaymentDailyStatsSerializer(serializers.ModelSerializer):
+    amount_sum = MinorUnitsField(source='amount_minor_sum', max_digits=18, read_only=True)
+    amount_received_sum = MinorUnitsField(source='amount_received_minor_sum', max_digits=18, read_only=True)
 
+    class Meta:
+        model = PaymentDailyStats
+        fields = ['day', 'currency', 'country', 'status', 'count', 'amount_sum', 'amount_received_sum']
+        read_only_fields = ['day', 'currency', 'country', 'status', 'count']
@@ -0,0 +1,265 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+
+from . import stats
+from .caching import TTLCache
+from .gateway import GatewayError, get_paystack_client
+from .models import VERSION_FIELDS, Payment, bump_version
+from .money import format_minor
+
+logger = logging.getLogger(__name__)
+
+# Webhook event -> (new status, statuses it may replace). Anything else is left alone,
+# so replayed or out-of-order deliveries are no-ops.
+WEBHOOK_TRANSITIONS = {
+    'charge.success': ('successful', ('pending', 'failed')),
+    'charge.failed': ('failed', ('pending',)),
+}
+
+# Paystack transaction statuses that aren't final yet
+GATEWAY_IN_PROGRESS = {'ongoing', 'pending', 'processing', 'queued'}
+
+# Payment statuses verification can no longer change
+FINAL_STATUSES = frozenset({'successful', 'failed'})
+
+# Verify results keyed by reference: concurrent callers share one Paystack call, and
+# answers (including "still in progress") are reused briefly. Failures aren't kept.
+_verify_cache = TTLCache(ttl=settings.PAYSTACK_VERIFY_CACHE_TTL, max_entries=settings.PAYSTACK_VERIFY_CACHE_SIZE)
+
+# Validated fields copied onto a new Payment row at initiation
+INITIATION_FIELDS = (
+    'name', 'email', 'phone_number', 'amount_minor', 'currency', 'state', 'country',
+    'amount_ngn_minor', 'exchange_rate', 'rate_source',
+)
+
+# Callback Paystack redirects the customer to after checkout
+CALLBACK_URL = 'https://payment-repos.onrender.com/api/v1/payment/verify/'  # Replace with your actual callback URL
+
+
+def build_initialize_payload(payment):
+    """Paystack transaction/initialize body for a freshly created payment."""
+    return {
+        'email': payment.email,
+        'amount': payment.amount_ngn_minor,  # in kobo
+        'reference': payment.reference,
+        'currency': 'NGN',  # Paystack only accepts NGN for now
+        'callback_url': CALLBACK_URL,
+        'metadata': {
+            'name': payment.name,
+            'phone_number': payment.phone_number,
+            'original_amount': format_minor(payment.amount_minor),
+            'original_currency': payment.currency,
+            'country': payment.country,
+            'state': payment.state,
+        }
+    }
+
+
+def new_payment(validated_data):
+    """
+    Unsaved, 'queued' Payment holding everything known before Paystack is called,
+    including the locally generated reference that is sent to Paystack.
+    """
+    return Payment(**{f: validated_data[f] for f in INITIATION_FIELDS})
+
+
+def request_initialization(payment, client):
+    """
+    Ask Paystack to initialize a queued payment. Makes no database calls, so it can
+    run outside any transaction or on a worker thread.
+    Returns (fields to record, authorization URL or None, error message or None).
+    """
+    try:
+        paystack_data = client.initialize_transaction(build_initialize_payload(payment))
+        auth_url = paystack_data.get('authorization_url')
+        if not auth_url:
+            raise GatewayError("No authorization URL returned from Paystack.")
+    except GatewayError as e:
+        return {'gateway_state': 'rejected', 'status': 'failed'}, None, str(e)
+    # The amount only counts as received once Paystack has accepted the transaction
+    fields = {
+        'gateway_state': 'initialized', 'authorization_url': auth_url,
+        'amount_received_minor': payment.amount_ngn_minor,
+    }
+    return fields, auth_url, None
+
+
+def initiate_payment(validated_data, client=None):
+    """
+    Insert the payment with everything known up front (reference included) in its own
+    short transaction, then ask Paystack to initialize it once the row has committed
+    and record the outcome in one narrow write.
+    Returns (payment, authorization URL or None, error message or None).
+    """
+    payment = new_payment(validated_data)
+    payment.save(force_insert=True)
+    fields, auth_url, error = request_initialization(payment, client or get_paystack_client())
+    record_initialization(payment, fields)
+    return payment, auth_url, error
+
+
+def queued(payment):
+    """Queryset matching `payment` only while it is still waiting on the gateway."""
+    return Payment.objects.filter(pk=payment.pk, gateway_state='queued')
+
+
+def record_initialization(payment, fields):
+    """Record the gateway outcome with one narrow, conditional UPDATE."""
+    old = stats.snapshot(payment)
+    for name, value in fields.items():
+        setattr(payment, name, value)
+    with transaction.atomic():
+        updated = queued(payment).update(**bump_version(**fields))
+        if updated:
+            payment.version += 1
+            if stats.snapshot(payment) != old:
+                stats.record_transitions([(payment, *old)])
+    return updated
+
+
+def initialize_many(payments, client, workers):
+    """
+    Initialize saved, queued `payments` with Paystack concurrently and record every
+    outcome in one bulk UPDATE.
+    Returns (payment, authorization URL or None, error message or None) in input order.
+    """
+    def initialize(payment):
+        old = stats.snapshot(payment)
+        fields, auth_url, error = request_initialization(payment, client)
+        for name, value in fields.items():
+            setattr(payment, name, value)
+        payment.touch()
+        return payment, auth_url, error, old
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(payments)))) as executor:
+        results = list(executor.map(initialize, payments))
+
+    with transaction.atomic():
+        Payment.objects.filter(gateway_state='queued').bulk_update(
+            payments, ['gateway_state', 'authorization_url', 'status', 'amount_received_minor', *VERSION_FIELDS]
+        )
+        stats.record_transitions([
+            (payment, *old) for payment, _, _, old in results if stats.snapshot(payment) != old
+        ])
+    return [(payment, auth_url, error) for payment, auth_url, error, _ in results]
+
+
+def apply_verification(payment, data):
+    """
+    Update `payment` from Paystack's verify `data` and return the fields that changed.
+    Transactions Paystack still reports as in progress leave the payment untouched.
+    """
+    if data.get('status') in GATEWAY_IN_PROGRESS:
+        return []
+    if data.get('status') == 'success':
+        values = {'status': 'successful', 'amount_received_minor': int(data.get('amount') or 0)}  # kobo
+    else:
+        values = {'status': 'failed'}
+    changed = [name for name, value in values.items() if getattr(payment, name) != value]
+    for name in changed:
+        setattr(payment, name, values[name])
+    return changed
+
+
+def fetch_verification(reference, client=None):
+    """
+    Paystack's verify `data` for `reference`, shared with concurrent callers and
+    reused for PAYSTACK_VERIFY_CACHE_TTL seconds. Raises GatewayError.
+    """
+    client = client or get_paystack_client()
+    data = _verify_cache.get_or_load(reference, lambda: client.verify_transaction(reference))
+    if data is None:
+        raise GatewayError("Failed to verify transaction with Paystack.")
+    return data
+
+
+def clear_verify_cache():
+    _verify_cache.clear()
+
+
+def settle_verification(payment, data):
+    """
+    Apply verify `data` to a pending `payment` with one conditional UPDATE.
+    Nothing is written when nothing changed; if another request or a webhook settled
+    the payment first, `payment` is reloaded instead. Returns True if the row was written.
+    """
+    old = stats.snapshot(payment)
+    fields = apply_verification(payment, data)
+    if not fields:
+        return False
+    values = {name: getattr(payment, name) for name in fields}
+    with transaction.atomic():
+        updated = Payment.objects.filter(pk=payment.pk, status='pending').update(**bump_version(**values))
+        if updated:
+            payment.version += 1
+            stats.record_transitions([(payment, *old)])
+    if not updated:
+        payment.refresh_from_db()
+    return bool(updated)
+
+
+def needs_verification(payment):
+    """Pending and known to Paystack; 'queued' rows are left to relay_queued_payments."""
+    return payment.status not in FINAL_STATUSES and payment.gateway_state != 'queued'
+
+
+def verify_payment(payment, client=None):
+    """
+    Bring `payment` up to date with Paystack. Final and still-queued payments are
+    returned as stored without calling Paystack. Raises GatewayError.
+    """
+    if needs_verification(payment):
+        settle_verification(payment, fetch_verification(payment.reference, client))
+    return payment
+
+
+def _webhook_kobo(value):
+    """Paystack's amount in kobo as an int, or None if it isn't a whole number."""
+    try:
+        amount = Decimal(str(value or 0))
+    except InvalidOperation:
+        return None
+    if not amount.is_finite() or amount != amount.to_integral_value():
+        return None
+    return int(amount)
+
+
+def apply_webhook_event(event):
+    """
+    Apply a Paystack webhook event with one indexed read and one conditional UPDATE.
+    Returns the number of payments changed (0 for unknown, duplicate or stale events).
+    """
+    data = event.get('data') or {}
+    transition = WEBHOOK_TRANSITIONS.get(event.get('event'))
+    reference = data.get('reference')
+    if not transition or not reference:
+        return 0
+
+    new_status, from_statuses = transition
+    fields = {'status': new_status}
+    if new_status == 'successful':
+        amount = _webhook_kobo(data.get('amount'))
+        if amount is None:
+            # Acknowledged and left pending; verify_pending settles it from the verify API
+            logger.warning("Ignoring %s for %s: invalid amount %r", event.get('event'), reference, data.get('amount'))
+            return 0
+        fields['amount_received_minor'] = amount
+
+    payment = Payment.objects.filter(reference=reference, status__in=from_statuses).first()
+    if payment is None:
+        return 0
+
+    # Conditional on the status we read, so a concurrent update can't be counted twice
+    old = stats.snapshot(payment)
+    with transaction.atomic():
+        updated = Payment.objects.filter(pk=payment.pk, status=payment.status).update(**bump_version(**fields))
+        if updated:
+            for name, value in fields.items():
+                setattr(payment, name, value)
+            payment.version += 1
+            stats.record_transitions([(payment, *old)])
+    return updated
@@ -0,0 +1,120 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Payment, PaymentDailyStats
+
+
+def snapshot(payment):
+    """The (status, amount_received_minor) pair the rollup currently counts `payment` under."""
+    return payment.status, payment.amount_received_minor
+
+
+def _bucket(payment, status):
+    return timezone.localdate(payment.created_at), payment.currency, payment.country, status
+
+
+def _apply(deltas):
+    """Add {bucket: [count, amount, amount_received]} deltas (minor units) with F() increments."""
+    for (day, currency, country, status), (count, amount, received) in deltas.items():
+        if not count and not amount and not received:
+            continue
+        key = dict(day=day, currency=currency, country=country, status=status)
+        increments = dict(
+            count=F('count') + count,
+            amount_minor_sum=F('amount_minor_sum') + amount,
+            amount_received_minor_sum=F('amount_received_minor_sum') + received,
+        )
+        if PaymentDailyStats.objects.filter(**key).update(**increments):
+            continue
+        try:
+            with transaction.atomic():
+                PaymentDailyStats.objects.create(
+                    count=count, amount_minor_sum=amount, amount_received_minor_sum=received, **key
+                )
+        except IntegrityError:
+            # Another writer created the bucket first
+            PaymentDailyStats.objects.filter(**key).update(**increments)
+
+
+def record_created(payments):
+    """Count newly inserted payments."""
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for payment in payments:
+        delta = deltas[_bucket(payment, payment.status)]
+        delta[0] += 1
+        delta[1] += payment.amount_minor or 0
+        delta[2] += payment.amount_received_minor or 0
+        payment._tracked = snapshot(payment)
+    _apply(deltas)
+
+
+def record_transitions(changes):
+    """
+    Move payments between buckets. `changes` holds (payment, old_status, old_amount_received_minor)
+    for payments whose new values are already on the instance and in the database.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for payment, old_status, old_received in changes:
+        old = deltas[_bucket(payment, old_status)]
+        old[0] -= 1
+        old[1] -= payment.amount_minor or 0
+        old[2] -= old_received or 0
+
+        new = deltas[_bucket(payment, payment.status)]
+        new[0] += 1
+        new[1] += payment.amount_minor or 0
+        new[2] += payment.amount_received_minor or 0
+        payment._tracked = snapshot(payment)
+    _apply(deltas)
+
+
+def track_payment_save(sender, instance, created, raw=False, **kwargs):
+    """post_save receiver keeping the rollup in step with Payment.save()."""
+    if raw:
+        return
+    if created:
+        record_created([instance])
+        return
+    tracked = getattr(instance, '_tracked', None)
+    if tracked is not None and tracked != snapshot(instance):
+        record_transitions([(instance, *tracked)])
+
+
+def rebuild(start=None, end=None):
+    """
+    Recompute the rollup from Payment rows, optionally only for days in [start, end].
+    Returns the number of buckets written.
+    """
+    payments = Payment.objects.annotate(day=TruncDate('created_at'))
+    existing = PaymentDailyStats.objects.all()
+    if start:
+        payments = payments.filter(day__gte=start)
+        existing = existing.filter(day__gte=start)
+    if end:
+        payments = payments.filter(day__lte=end)
+        existing = existing.filter(day__lte=end)
+
+    rows = (
+        payments.order_by()
+        .values('day', 'currency', 'country', 'status')
+        .annotate(
+            n=Count('id'),
+            total=Coalesce(Sum('amount_minor'), 0),
+            received=Coalesce(Sum('amount_received_minor'), 0),
+        )
+    )
+    stats = [
+        PaymentDailyStats(
+            day=row['day'], currency=row['currency'], country=row['country'], status=row['status'],
+            count=row['n'], amount_minor_sum=row['total'], amount_received_minor_sum=row['received'],
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        existing.delete()
+        PaymentDailyStats.objects.bulk_create(stats, batch_size=1000)
+    return len(stats)
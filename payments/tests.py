@@ -1,11 +1,49 @@
+import csv
+import hashlib
+import hmac
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from decimal import Decimal
 from unittest.mock import patch, Mock
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
-from payments.models import Payment
+from payments import geoip, idempotency
+from payments.caching import TTLCache
+from payments.conversions import get_exchange_rate, get_live_exchange_rate, clear_rate_cache
+from payments.formatting import row_formatter
+from payments.gateway import GatewayError, PaystackClient, get_paystack_client
+from payments.geoip import GeoIPIndex
+from payments.models import IdempotencyKey, Payment, PaymentDailyStats
+from payments.money import convert_minor, format_minor, rate_to_micro, to_decimal, to_minor
+from payments.pagination import EstimatedCountPaginator
+from payments.registry import Registry, registry
+from payments.serializers import PaymentListSerializer, PaymentSerializer, detect_country_code
+from payments.resilience import CircuitBreaker, hedged_call
+from payments.services import apply_webhook_event, clear_verify_cache, fetch_verification, settle_verification
+from loadtest.stub_server import StubState, make_server
 
 class PaymentAPITest(APITestCase):
     def setUp(self):
+        clear_verify_cache()
         self.valid_data = {
             'name': 'John Doe',
             'email': 'john@gmail.com',
@@ -19,10 +57,10 @@ class PaymentAPITest(APITestCase):
         }
 
     # Test creating payment using live exchange rate
-    @patch('payments.serializers.get_live_exchange_rate')
-    @patch('payments.serializers.requests.post')
+    @patch('payments.serializers.get_exchange_rate')
+    @patch('payments.gateway.requests.Session.post')
     def test_create_payment_live_rate(self, mock_post, mock_rate):
-        mock_rate.return_value = Decimal('1535.451')  # mocked live rate
+        mock_rate.return_value = (Decimal('1535.451'), 'live')  # mocked live rate
 
         mock_post.return_value = Mock(
             status_code=200,
@@ -34,14 +72,14 @@ class PaymentAPITest(APITestCase):
 
         self.assertEqual(response.status_code, 201)
         payment = Payment.objects.first()
-        expected = Decimal(self.valid_data['amount']) * mock_rate.return_value
+        expected = Decimal(self.valid_data['amount']) * mock_rate.return_value[0]
         self.assertEqual(payment.amount_received, expected)
 
     # Test creating payment using fallback exchange rate
-    @patch('payments.serializers.get_live_exchange_rate')
-    @patch('payments.serializers.requests.post')
+    @patch('payments.serializers.get_exchange_rate')
+    @patch('payments.gateway.requests.Session.post')
     def test_create_payment_fallback_rate(self, mock_post, mock_rate):
-        mock_rate.return_value = Decimal('1535.451')  # fallback rate
+        mock_rate.return_value = (Decimal('1535.451'), 'fallback')  # fallback rate
 
         mock_post.return_value = Mock(
             status_code=200,
@@ -53,11 +91,11 @@ class PaymentAPITest(APITestCase):
 
         self.assertEqual(response.status_code, 201)
         payment = Payment.objects.first()
-        expected = Decimal(self.valid_data['amount']) * mock_rate.return_value
+        expected = Decimal(self.valid_data['amount']) * mock_rate.return_value[0]
         self.assertEqual(payment.amount_received, expected)
 
     # Test Paystack payment initialization
-    @patch('payments.views.requests.post')
+    @patch('payments.gateway.requests.Session.post')
     def test_paystack_initialization_mocked(self, mock_post):
         mock_post.return_value.status_code = 200
         mock_post.return_value.json.return_value = {
@@ -74,7 +112,7 @@ class PaymentAPITest(APITestCase):
         self.assertIn('payment_link', response.data)
 
     # Test Paystack payment verification
-    @patch('payments.views.requests.get')
+    @patch('payments.gateway.requests.Session.get')
     def test_paystack_verification_mocked(self, mock_get):
         reference = 'test-ref-1234'
         Payment.objects.create(
@@ -84,7 +122,8 @@ class PaymentAPITest(APITestCase):
             amount=100,
             currency='USD',
             reference=reference,
-            amount_received=Decimal('150000')
+            amount_received=Decimal('150000'),
+            gateway_state='initialized',
         )
 
         mock_get.return_value.status_code = 200
@@ -113,7 +152,51 @@ class PaymentAPITest(APITestCase):
         url = reverse('payment-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
+
+    # Test the list is cursor-paginated newest first without skipping or repeating rows
+    def test_list_payments_cursor_pagination(self):
+        for i in range(5):
+            Payment.objects.create(
+                name=f'Payer {i}',
+                email='jane@gmail.com',
+                phone_number='08098765432',
+                amount=100,
+                currency='USD',
+            )
+
+        url = reverse('payment-list')
+        seen = []
+        response = self.client.get(url, {'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, list(Payment.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    # Test pages split inside a run of equal created_at values by (created_at, id), both ways
+    def test_list_payments_cursor_equal_timestamps(self):
+        for i in range(5):
+            Payment.objects.create(
+                name=f'Payer {i}', email='jane@gmail.com', phone_number='08098765432', amount=100, currency='USD',
+            )
+        Payment.objects.update(created_at=timezone.now())
+
+        url = reverse('payment-list')
+        pages = [self.client.get(url, {'page_size': 2})]
+        while pages[-1].data['next']:
+            pages.append(self.client.get(pages[-1].data['next']))
+        seen = [row['id'] for page in pages for row in page.data['results']]
+        self.assertEqual(seen, list(Payment.objects.order_by('-id').values_list('id', flat=True)))
+
+        back = self.client.get(pages[-1].data['previous'])
+        self.assertEqual(
+            [row['id'] for row in back.data['results']], [row['id'] for row in pages[-2].data['results']]
+        )
+        self.assertEqual(self.client.get(url, {'cursor': 'cD1nYXJiYWdl'}).status_code, 404)
 
     # Test getting a payment by ID
     def test_get_payment_by_id(self):
@@ -129,3 +212,1234 @@ class PaymentAPITest(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data['name'], 'Jane Doe')
+
+    # Test polling a payment by ID revalidates with ETags and sees saves and updates
+    def test_get_payment_by_id_conditional(self):
+        payment = Payment.objects.create(
+            name='Jane Doe', email='jane@gmail.com', phone_number='08098765432', amount=100, currency='USD',
+        )
+        url = reverse('payment-id', kwargs={'id': payment.id})
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertIn('Last-Modified', response)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+
+        payment.status = 'failed'
+        payment.save(update_fields=['status'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'failed')
+
+        apply_webhook_event({"event": "charge.success", "data": {"reference": payment.reference, "amount": 500}})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'successful')
+
+    # Test an unchanged list page is a 304 and a new payment changes its ETag
+    def test_list_payments_conditional(self):
+        fields = dict(name='Jane Doe', email='jane@gmail.com', phone_number='08098765432', amount=100, currency='USD')
+        Payment.objects.create(**fields)
+        url = reverse('payment-list')
+        etag = self.client.get(url)['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Payment.objects.create(**fields)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+    # Test the hardcoded table is used when no live rate is available
+    @patch('payments.conversions._load_table', return_value=None)
+    @patch('payments.gateway.requests.Session.post')
+    def test_create_payment_hardcoded_fallback_rate(self, mock_post, mock_rate):
+        mock_post.return_value = Mock(
+            status_code=200,
+            json=lambda: {"status": True, "data": {"authorization_url": "http://fake", "reference": "TEST789"}}
+        )
+
+        url = reverse('payment-initiate')
+        response = self.client.post(url, self.valid_data, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        payment = Payment.objects.first()
+        self.assertEqual(payment.amount_received, Decimal('153500.00'))
+        self.assertEqual(payment.rate_source, 'fallback')
+
+    # Test the applied rate is stored on the payment at initiation
+    @patch('payments.serializers.get_exchange_rate')
+    @patch('payments.gateway.requests.Session.post')
+    def test_create_payment_persists_applied_rate(self, mock_post, mock_rate):
+        mock_rate.return_value = (Decimal('1535.451'), 'live')
+        mock_post.return_value = Mock(
+            status_code=200,
+            json=lambda: {"status": True, "data": {"authorization_url": "http://fake", "reference": "TEST321"}}
+        )
+
+        response = self.client.post(reverse('payment-initiate'), self.valid_data, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        payment = Payment.objects.first()
+        self.assertEqual(payment.exchange_rate, Decimal('1535.451'))
+        self.assertEqual(payment.amount_ngn, Decimal('153545.10'))
+        self.assertEqual(payment.rate_source, 'live')
+        self.assertEqual(response.data['payment']['amount_ngn'], '153545.10')
+
+    # Test rendering a payment reads amount_ngn from the row without any rate lookup
+    @patch('payments.serializers.get_exchange_rate', side_effect=AssertionError('network call'))
+    def test_render_payment_makes_no_rate_lookup(self, mock_rate):
+        payment = Payment.objects.create(
+            name='Jane Doe',
+            email='jane@gmail.com',
+            phone_number='08098765432',
+            amount=100,
+            currency='USD',
+            amount_ngn=Decimal('153500.00'),
+            exchange_rate=Decimal('1535'),
+            rate_source='fallback',
+        )
+
+        self.assertEqual(PaymentSerializer(payment).data['amount_ngn'], '153500.00')
+
+    # Test async initiation looks up geo-IP and the rate table, then creates the payment
+    @patch('payments.views.detect_country_code', return_value='GB')
+    @patch('payments.views.get_rate_table_entry', return_value=({'GBP': Decimal('2000')}, 'live'))
+    @patch('payments.serializers.get_exchange_rate', return_value=(Decimal('2000'), 'live'))
+    @patch('payments.gateway.requests.Session.post')
+    def test_create_payment_async(self, mock_post, mock_rate, mock_table, mock_geo):
+        mock_post.return_value = Mock(
+            status_code=200,
+            json=lambda: {"status": True, "data": {"authorization_url": "http://fake", "reference": "ASYNC1"}}
+        )
+        data = dict(self.valid_data, country='')
+
+        response = self.client.post(reverse('payment-initiate-async'), data, format='json')
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['payment_link'], 'http://fake')
+        mock_geo.assert_called_once()
+        mock_table.assert_called_once()
+        self.assertEqual(mock_rate.call_args.kwargs['table_entry'], mock_table.return_value)
+        payment = Payment.objects.get()
+        self.assertEqual(payment.currency, 'GBP')
+        self.assertEqual(payment.authorization_url, 'http://fake')
+        self.assertEqual(payment.amount_received, Decimal('200000.00'))
+
+    # Test async verification updates the payment status
+    @patch('payments.gateway.requests.Session.get')
+    def test_verify_payment_async(self, mock_get):
+        Payment.objects.create(
+            name='John Doe',
+            email='john@gmail.com',
+            phone_number='08012345678',
+            amount=100,
+            currency='USD',
+            reference='async-ref',
+            gateway_state='initialized',
+        )
+        mock_get.return_value = Mock(
+            status_code=200,
+            json=lambda: {"status": True, "data": {"status": "success", "amount": 10000}}
+        )
+
+        response = self.client.get(reverse('payment-verify-async', kwargs={'reference': 'async-ref'}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'successful')
+        self.assertEqual(Payment.objects.get(reference='async-ref').amount_received, Decimal('100'))
+
+    # Test references are generated locally and enforced unique
+    def test_reference_is_generated_and_unique(self):
+        fields = dict(name='Jane Doe', email='jane@gmail.com', phone_number='08098765432', amount=100)
+        first = Payment.objects.create(**fields)
+        second = Payment.objects.create(**fields)
+
+        self.assertTrue(first.reference)
+        self.assertNotEqual(first.reference, second.reference)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Payment.objects.create(reference=first.reference, **fields)
+
+    # Test bulk initiation returns per-item results and writes each row once per phase
+    @patch('payments.serializers.get_exchange_rate', return_value=(Decimal('1500'), 'live'))
+    @patch('payments.gateway.requests.Session.post')
+    def test_bulk_create_payments(self, mock_post, mock_rate):
+        def initialize(url, json=None, **kwargs):
+            if json['email'] == 'declined@gmail.com':
+                return Mock(status_code=400, json=lambda: {"status": False, "message": "Declined"})
+            return Mock(
+                status_code=200,
+                json=lambda: {"status": True, "data": {
+                    "authorization_url": f"http://fake/{json['reference']}", "reference": json['reference'],
+                }}
+            )
+
+        mock_post.side_effect = initialize
+        items = [
+            self.valid_data,
+            dict(self.valid_data, email='declined@gmail.com'),
+            dict(self.valid_data, email='john@unknown.org'),
+        ]
+
+        response = self.client.post(reverse('payment-bulk'), items, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        results = response.data['results']
+        self.assertEqual([r['status'] for r in results], ['created', 'failed', 'invalid'])
+        self.assertIn('email', results[2]['errors'])
+        self.assertEqual(Payment.objects.count(), 2)
+
+        created = Payment.objects.get(reference=results[0]['payment']['reference'])
+        self.assertEqual(created.authorization_url, results[0]['payment_link'])
+        self.assertEqual(created.amount_received, Decimal('150000.00'))
+        self.assertEqual(Payment.objects.get(email='declined@gmail.com').status, 'failed')
+
+    # Test initiation is one INSERT plus one narrow UPDATE, with the local reference sent to Paystack
+    @patch('payments.serializers.get_exchange_rate', return_value=(Decimal('1500'), 'live'))
+    @patch('payments.gateway.requests.Session.post')
+    def test_create_payment_single_write(self, mock_post, mock_rate):
+        mock_post.return_value = Mock(
+            status_code=200,
+            json=lambda: {"status": True, "data": {"authorization_url": "http://fake", "reference": "ignored"}}
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('payment-initiate'), self.valid_data, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        writes = [q['sql'].split()[0] for q in queries.captured_queries
+                  if '"payments_payment"' in q['sql'] and not q['sql'].startswith('SELECT')]
+        self.assertEqual(writes, ['INSERT', 'UPDATE'])
+
+        payment = Payment.objects.get()
+        self.assertEqual(mock_post.call_args.kwargs['json']['reference'], payment.reference)
+        self.assertEqual(payment.gateway_state, 'initialized')
+        self.assertEqual(payment.authorization_url, 'http://fake')
+
+    # Test a gateway rejection is recorded as a failed payment instead of an orphan pending row
+    @patch('payments.serializers.get_exchange_rate', return_value=(Decimal('1500'), 'live'))
+    @patch('payments.gateway.requests.Session.post')
+    def test_create_payment_gateway_rejection(self, mock_post, mock_rate):
+        mock_post.return_value = Mock(status_code=400, json=lambda: {"status": False, "message": "Invalid key"})
+
+        response = self.client.post(reverse('payment-initiate'), self.valid_data, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        payment = Payment.objects.get()
+        self.assertEqual(payment.status, 'failed')
+        self.assertEqual(payment.gateway_state, 'rejected')
+        self.assertIsNone(payment.amount_received)
+        self.assertEqual(PaymentDailyStats.objects.get(status='failed').amount_received_sum, Decimal('0'))
+
+
+class MoneyTest(APITestCase):
+    # Test minor-unit parsing, formatting and conversion round half up in integers
+    def test_minor_unit_arithmetic(self):
+        self.assertEqual(to_minor('19.995'), 2000)
+        self.assertEqual(to_minor(Decimal('0.004')), 0)
+        self.assertEqual(to_minor(100), 10000)
+        self.assertEqual(format_minor(123450), '1234.50')
+        self.assertEqual(format_minor(-5), '-0.05')
+        self.assertEqual(rate_to_micro(Decimal('1535.4555555')), 1535455556)
+        self.assertEqual(convert_minor(1999, 1535455556), 3069376)
+        self.assertEqual(convert_minor(-1999, 1535455556), -3069376)
+        self.assertEqual(to_decimal(to_minor('19.99')), Decimal('19.99'))
+        self.assertIsNone(to_decimal(None))
+
+    # Test the kobo sent to Paystack, stored and shown are the same integer
+    @patch('payments.serializers.get_exchange_rate', return_value=(Decimal('1535.4555555'), 'live'))
+    @patch('payments.gateway.requests.Session.post')
+    def test_charge_and_display_agree(self, mock_post, mock_rate):
+        mock_post.return_value = Mock(
+            status_code=200,
+            json=lambda: {"status": True, "data": {"authorization_url": "http://fake", "reference": "MONEY1"}}
+        )
+        data = {
+            'name': 'John Doe', 'email': 'john@gmail.com', 'phone_number': '08012345678',
+            'amount': '19.99', 'country': 'United States', 'state': 'NY',
+        }
+        response = self.client.post(reverse('payment-initiate'), data, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        payment = Payment.objects.get()
+        charged = mock_post.call_args.kwargs['json']['amount']
+        self.assertEqual(charged, 3069376)
+        self.assertEqual(payment.amount_ngn_minor, charged)
+        self.assertEqual(payment.amount_minor, 1999)
+        self.assertEqual(payment.exchange_rate, Decimal('1535.455556'))
+        self.assertEqual(response.data['payment']['amount'], '19.99')
+        self.assertEqual(response.data['payment']['amount_ngn'], '30693.76')
+
+        # Paystack reports the kobo back; nothing is lost on the way to the list view
+        with patch('payments.gateway.requests.Session.get') as mock_get:
+            mock_get.return_value = Mock(status_code=200, json=lambda: {
+                "status": True, "data": {"status": "success", "amount": charged},
+            })
+            self.client.get(reverse('payment-verify', kwargs={'reference': payment.reference}))
+        payment.refresh_from_db()
+        self.assertEqual(payment.amount_received_minor, charged)
+        listed = self.client.get(reverse('payment-list')).data['results'][0]
+        self.assertEqual(listed['amount_received'], '30693.76')
+
+
+class ExchangeRateCacheTest(SimpleTestCase):
+    def setUp(self):
+        clear_rate_cache()
+
+    def tearDown(self):
+        clear_rate_cache()
+
+    # Test repeated lookups for the same pair reuse the cached rate
+    @patch('payments.conversions._fetch_pair_rate')
+    def test_rate_is_cached_per_pair(self, mock_fetch):
+        mock_fetch.return_value = Decimal('0.75')
+
+        self.assertEqual(get_live_exchange_rate(to_currency='GBP', from_currency='USD'), Decimal('0.75'))
+        self.assertEqual(get_live_exchange_rate(to_currency='GBP', from_currency='USD'), Decimal('0.75'))
+        self.assertEqual(mock_fetch.call_count, 1)
+
+    # Test a failed refresh keeps serving the last good rate instead of 1
+    def test_failed_refresh_keeps_last_good_value(self):
+        now = [0.0]
+        cache = TTLCache(ttl=10, clock=lambda: now[0])
+        self.assertEqual(cache.get_or_load('USD', lambda: Decimal('1500')), Decimal('1500'))
+
+        now[0] = 60.0
+        self.assertEqual(cache.get_or_load('USD', lambda: None), Decimal('1500'))
+
+    # Test a stale entry is served while a refresh happens in the background
+    def test_stale_entry_served_while_revalidating(self):
+        now = [0.0]
+        cache = TTLCache(ttl=10, stale_ttl=100, clock=lambda: now[0])
+        cache.get_or_load('USD', lambda: Decimal('1500'))
+
+        now[0] = 20.0
+        refreshed = threading.Event()
+
+        def loader():
+            refreshed.set()
+            return Decimal('1600')
+
+        self.assertEqual(cache.get_or_load('USD', loader), Decimal('1500'))
+        self.assertTrue(refreshed.wait(1))
+
+    # Test concurrent misses for the same key share one load
+    def test_concurrent_misses_share_one_load(self):
+        cache = TTLCache(ttl=10)
+        calls = []
+        release = threading.Event()
+
+        def loader():
+            calls.append(1)
+            release.wait(1)
+            return Decimal('1500')
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_load('USD', loader)))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [Decimal('1500')] * 5)
+
+    # Test every NGN rate comes from a single "latest" table request
+    @patch('payments.conversions.requests.get')
+    def test_ngn_rates_share_one_table_request(self, mock_get):
+        mock_get.return_value.json.return_value = {
+            "result": "success",
+            "base_code": "USD",
+            "conversion_rates": {"USD": 1, "NGN": 1500, "GBP": 0.75, "EUR": 0.8},
+        }
+
+        self.assertEqual(get_live_exchange_rate(from_currency='USD'), Decimal('1500'))
+        self.assertEqual(get_live_exchange_rate(from_currency='GBP'), Decimal('2000'))
+        self.assertEqual(get_live_exchange_rate(from_currency='EUR'), Decimal('1875'))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertIn('/latest/USD', mock_get.call_args[0][0])
+
+    # Test an unavailable table yields None so callers can fall back
+    @patch('payments.conversions.requests.get', side_effect=requests.ConnectionError)
+    def test_unavailable_table_returns_none(self, mock_get):
+        self.assertIsNone(get_live_exchange_rate(from_currency='USD'))
+
+
+class RateProviderChainTest(SimpleTestCase):
+    def setUp(self):
+        clear_rate_cache()
+        self.addCleanup(clear_rate_cache)
+
+    # Test the chain falls through primary, secondary and the static table, reporting the source
+    @patch('payments.conversions._fetch_secondary_table')
+    @patch('payments.conversions._fetch_rate_table', return_value=None)
+    def test_chain_reports_source(self, mock_primary, mock_secondary):
+        mock_secondary.return_value = {'USD': Decimal('1490')}
+        self.assertEqual(get_exchange_rate('USD'), (Decimal('1490'), 'secondary'))
+
+        clear_rate_cache()
+        mock_secondary.return_value = None
+        self.assertEqual(get_exchange_rate('USD'), (Decimal('1535'), 'fallback'))
+        self.assertEqual(get_exchange_rate('JPY'), (None, None))
+
+    # Test same-currency payments are reported as 'identity', not as a live quote
+    @patch('payments.conversions._fetch_rate_table', side_effect=AssertionError('outbound call'))
+    def test_same_currency_is_identity(self, mock_primary):
+        self.assertEqual(get_exchange_rate('NGN'), (Decimal('1'), 'identity'))
+
+    # Test a rate table that already failed to load is not fetched a second time
+    @patch('payments.conversions._fetch_secondary_table', side_effect=AssertionError('refetched'))
+    @patch('payments.conversions._fetch_rate_table', side_effect=AssertionError('refetched'))
+    def test_prefetched_failure_is_reused(self, mock_primary, mock_secondary):
+        self.assertEqual(get_exchange_rate('USD', table_entry=None), (Decimal('1535'), 'fallback'))
+        self.assertEqual(
+            get_exchange_rate('USD', table_entry=({'USD': Decimal('1490')}, 'secondary')),
+            (Decimal('1490'), 'secondary'),
+        )
+
+    # Test a tripped breaker skips the provider until its cooldown has passed
+    def test_circuit_breaker_opens_and_probes(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_rate=0.5, slow_call_seconds=1, cooldown=30, min_calls=4, clock=lambda: now[0])
+        for elapsed in (0.1, 2.0, 0.1, 3.0):  # two slow calls out of four
+            self.assertTrue(breaker.allow())
+            breaker.record(True, elapsed)
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+
+        now[0] = 31.0
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # only one probe at a time
+        breaker.record(True, 0.1)
+        self.assertEqual(breaker.state, 'closed')
+
+    # Test a slow first attempt is hedged and the faster answer wins
+    def test_hedged_call_bounds_latency(self):
+        calls = []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(2)
+                return 'slow'
+            return 'fast'
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            started = time.monotonic()
+            self.assertEqual(hedged_call(executor, fetch, hedge_delay=0.05, timeout=2), 'fast')
+            self.assertLess(time.monotonic() - started, 1)
+            release.set()
+        self.assertEqual(len(calls), 2)
+
+
+class VerifyShortCircuitTest(APITestCase):
+    def setUp(self):
+        clear_verify_cache()
+
+    def make_payment(self, reference, status='pending'):
+        return Payment.objects.create(
+            name='John Doe', email='john@gmail.com', phone_number='08012345678',
+            amount=100, amount_received=Decimal('153500'), reference=reference, status=status,
+            gateway_state='initialized',
+        )
+
+    # Test final payments are served from the database without calling Paystack
+    @patch('payments.gateway.requests.Session.get', side_effect=AssertionError('outbound call'))
+    def test_final_payment_skips_gateway(self, mock_get):
+        self.make_payment('final-ref', status='successful')
+
+        response = self.client.get(reverse('payment-verify', kwargs={'reference': 'final-ref'}))
+        async_response = self.client.get(reverse('payment-verify-async', kwargs={'reference': 'final-ref'}))
+
+        self.assertEqual(response.data['status'], 'successful')
+        self.assertEqual(async_response.json()['status'], 'successful')
+        mock_get.assert_not_called()
+
+    # Test polling a pending payment shares one upstream answer and writes nothing
+    @patch('payments.gateway.requests.Session.get')
+    def test_in_progress_result_is_reused_without_writes(self, mock_get):
+        payment = self.make_payment('poll-ref')
+        mock_get.return_value = Mock(status_code=200, json=lambda: {"status": True, "data": {"status": "ongoing"}})
+
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                response = self.client.get(reverse('payment-verify', kwargs={'reference': 'poll-ref'}))
+                self.assertEqual(response.data['status'], 'pending')
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')])
+        payment.refresh_from_db()
+        self.assertEqual(payment.version, 1)
+
+    # Test concurrent verifies for one reference make a single Paystack call
+    def test_concurrent_verifies_are_coalesced(self):
+        client = Mock()
+
+        def verify_transaction(reference):
+            time.sleep(0.1)
+            return {'status': 'success', 'amount': 15350000}
+        client.verify_transaction.side_effect = verify_transaction
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            results = list(pool.map(lambda _: fetch_verification('shared-ref', client), range(5)))
+
+        self.assertEqual(client.verify_transaction.call_count, 1)
+        self.assertEqual(results, [{'status': 'success', 'amount': 15350000}] * 5)
+
+    # Test failures aren't cached, so the next poll asks Paystack again
+    def test_failure_is_not_cached(self):
+        client = Mock()
+        client.verify_transaction.side_effect = [GatewayError('down'), {'status': 'failed'}]
+
+        with self.assertRaises(GatewayError):
+            fetch_verification('flaky-ref', client)
+        self.assertEqual(fetch_verification('flaky-ref', client), {'status': 'failed'})
+
+    # Test a payment settled by someone else meanwhile is reloaded, not overwritten
+    def test_settle_skips_already_settled_rows(self):
+        stale = self.make_payment('race-ref')
+        Payment.objects.filter(pk=stale.pk).update(status='successful', version=2)
+
+        self.assertFalse(settle_verification(stale, {'status': 'failed'}))
+        self.assertEqual(stale.status, 'successful')
+        self.assertEqual(Payment.objects.get(pk=stale.pk).status, 'successful')
+        row = PaymentDailyStats.objects.get(status='pending')
+        self.assertEqual(row.count, 1)
+
+
+class PaystackClientTest(SimpleTestCase):
+    # Test the shared client reuses one session and pool across calls
+    def test_client_is_shared_and_pooled(self):
+        client = get_paystack_client()
+        self.assertIs(client, get_paystack_client())
+        adapter = client.session.get_adapter('https://api.paystack.co')
+        self.assertEqual(adapter._pool_maxsize, settings.PAYSTACK_POOL_MAXSIZE)
+        self.assertEqual(adapter.max_retries.allowed_methods, frozenset({'GET'}))
+        self.assertTrue(client.session.headers['Authorization'].startswith('Bearer '))
+
+    # Test gateway failures surface as GatewayError with split timeouts applied
+    @patch('payments.gateway.requests.Session.get', side_effect=requests.ConnectionError('down'))
+    def test_verify_connection_error_raises_gateway_error(self, mock_get):
+        client = PaystackClient(secret_key='sk', verify_url='https://paystack.test/verify')
+
+        with self.assertRaises(GatewayError):
+            client.verify_transaction('ref-1')
+        self.assertEqual(
+            mock_get.call_args.kwargs['timeout'],
+            (settings.PAYSTACK_CONNECT_TIMEOUT, settings.PAYSTACK_READ_TIMEOUT),
+        )
+
+
+class GeoIPIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmpdir, 'ranges.csv')
+        with open(self.csv_path, 'w') as f:
+            f.write("start_ip,end_ip,country\n")
+            f.write("41.58.0.0,41.58.255.255,NG\n")
+            f.write("8.8.8.0,8.8.8.255,US\n")
+            f.write("2c0f:f5c0::,2c0f:f5c0:ffff:ffff:ffff:ffff:ffff:ffff,GH\n")
+
+    def tearDown(self):
+        geoip._index = None
+        geoip.lookup_country.cache_clear()
+        shutil.rmtree(self.tmpdir)
+
+    # Test IPv4, IPv4-mapped and IPv6 addresses resolve by range
+    def test_lookup_by_range(self):
+        index = GeoIPIndex.from_csv(self.csv_path)
+
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.lookup('41.58.10.1'), 'NG')
+        self.assertEqual(index.lookup('8.8.8.8'), 'US')
+        self.assertEqual(index.lookup('::ffff:8.8.8.8'), 'US')
+        self.assertEqual(index.lookup('2c0f:f5c0::1'), 'GH')
+        self.assertIsNone(index.lookup('8.8.9.1'))
+        self.assertIsNone(index.lookup('not-an-ip'))
+
+    # Test the management command builds an index that detection uses without leaving the process
+    @patch('payments.serializers.requests.get', side_effect=AssertionError('network call'))
+    def test_build_command_and_offline_detection(self, mock_get):
+        output = os.path.join(self.tmpdir, 'index.json')
+        call_command('build_geoip_index', self.csv_path, output=output, stdout=io.StringIO())
+        self.assertTrue(geoip.load_index(output))
+
+        request = RequestFactory().get('/', REMOTE_ADDR='8.8.8.8')
+        self.assertEqual(detect_country_code(request), 'US')
+        self.assertEqual(geoip.lookup_country.cache_info().currsize, 1)
+
+
+class RegistryTest(SimpleTestCase):
+    # Test codes, alpha-3 codes, names, aliases and misspellings resolve to one country
+    def test_country_aliases(self):
+        nigeria = registry.by_code('NG')
+        for value in ['NG', 'ng', 'NGA', 'Nigeria', ' nigera ', 'Federal Republic of Nigeria']:
+            self.assertIs(registry.country(value), nigeria, value)
+        self.assertEqual(registry.country('U.S.A.').code, 'US')
+        self.assertEqual(registry.country('Côte d’Ivoire').code, 'CI')
+        self.assertEqual(registry.country('guinea bissau').code, 'GW')
+        self.assertIsNone(registry.country('Atlantis'))
+        self.assertEqual(len(registry.countries), 250)  # ISO 3166-1 plus EU
+
+    # Test conflicting aliases in the data file are rejected when the registry is built
+    def test_conflicting_alias(self):
+        countries = [
+            {'code': 'NG', 'alpha3': 'NGA', 'name': 'NIGERIA', 'currency': 'NGN', 'aliases': ['NIGER']},
+            {'code': 'NE', 'alpha3': 'NER', 'name': 'NIGER', 'currency': 'XOF'},
+        ]
+        with self.assertRaises(ImproperlyConfigured):
+            Registry(countries, ['NGN'], ['gmail.com'])
+
+    # Test validators use the registry for countries, gateway currencies and email domains
+    @patch('payments.serializers.get_exchange_rate', return_value=(Decimal('1700'), 'live'))
+    def test_validation_lookups(self, mock_rate):
+        data = {
+            'name': 'Jean Dupont', 'email': 'jean@Gmail.com', 'phone_number': '0612345678',
+            'amount': '10.00', 'country': 'FRA', 'state': 'Paris',
+        }
+        serializer = PaymentSerializer(data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['country'], 'FRANCE')
+        self.assertEqual(serializer.validated_data['currency'], 'EUR')
+
+        serializer = PaymentSerializer(data=dict(data, country='India'))
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('currency', serializer.errors)
+
+        serializer = PaymentSerializer(data=dict(data, country='Antarctica'))
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('Supported countries are:', serializer.errors['country'][0])
+
+        serializer = PaymentSerializer(data=dict(data, email='jean@gmail.com.example'))
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('email', serializer.errors)
+
+
+@patch('payments.gateway.requests.Session.post', side_effect=AssertionError('outbound call'))
+@patch('payments.gateway.requests.Session.get', side_effect=AssertionError('outbound call'))
+class PaystackWebhookTest(APITestCase):
+    secret = 'sk_test_webhook'
+
+    def setUp(self):
+        self.payment = Payment.objects.create(
+            name='John Doe',
+            email='john@gmail.com',
+            phone_number='08012345678',
+            amount=100,
+            currency='USD',
+            reference='hook-ref',
+        )
+        patcher = patch.object(get_paystack_client(), 'secret_key', self.secret)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post_event(self, event, signature=None):
+        body = json.dumps(event).encode()
+        if signature is None:
+            signature = hmac.new(self.secret.encode(), body, hashlib.sha512).hexdigest()
+        return self.client.post(
+            reverse('payment-webhook'), body, content_type='application/json',
+            HTTP_X_PAYSTACK_SIGNATURE=signature,
+        )
+
+    # Test a signed charge.success settles the payment, and replays change nothing
+    def test_charge_success_is_applied_once(self, mock_get, mock_post):
+        event = {"event": "charge.success", "data": {"reference": "hook-ref", "amount": 15000000}}
+
+        self.assertEqual(self.post_event(event).status_code, 200)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'successful')
+        self.assertEqual(self.payment.amount_received, Decimal('150000'))
+
+        self.assertEqual(apply_webhook_event(event), 0)
+        self.assertEqual(self.post_event(event).status_code, 200)
+
+    # Test a signed event with an unusable amount is acknowledged and leaves the payment pending
+    def test_malformed_amount_is_acknowledged(self, mock_get, mock_post):
+        for amount in ('abc', '150.5', [1]):
+            event = {"event": "charge.success", "data": {"reference": "hook-ref", "amount": amount}}
+            with self.assertLogs('payments.services', 'WARNING'):
+                self.assertEqual(self.post_event(event).status_code, 200)
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'pending')
+        self.assertIsNone(self.payment.amount_received)
+
+    # Test a late charge.failed cannot undo a successful payment
+    def test_charge_failed_only_applies_to_pending(self, mock_get, mock_post):
+        Payment.objects.filter(pk=self.payment.pk).update(status='successful')
+
+        self.post_event({"event": "charge.failed", "data": {"reference": "hook-ref"}})
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'successful')
+
+    # Test events with a bad signature are rejected untouched
+    def test_invalid_signature_is_rejected(self, mock_get, mock_post):
+        event = {"event": "charge.success", "data": {"reference": "hook-ref", "amount": 100}}
+
+        response = self.post_event(event, signature='bad')
+
+        self.assertEqual(response.status_code, 400)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'pending')
+
+
+class VerifyPendingCommandTest(APITestCase):
+    def setUp(self):
+        fields = dict(
+            name='John Doe', email='john@gmail.com', phone_number='08012345678', amount=100,
+            gateway_state='initialized',
+        )
+        for reference in ('paid', 'declined', 'ongoing', 'unreachable'):
+            Payment.objects.create(reference=reference, **fields)
+        Payment.objects.create(reference='already-paid', status='successful', **fields)
+
+    # Test pending payments are verified concurrently and written back in bulk
+    @patch('payments.gateway.requests.Session.get')
+    def test_verify_pending_settles_rows(self, mock_get):
+        statuses = {'paid': 'success', 'declined': 'failed', 'ongoing': 'ongoing'}
+
+        def verify(url, **kwargs):
+            reference = url.rsplit('/', 1)[-1]
+            if reference not in statuses:
+                raise requests.ConnectionError('down')
+            return Mock(
+                status_code=200,
+                json=lambda: {"status": True, "data": {"status": statuses[reference], "amount": 5000}}
+            )
+
+        mock_get.side_effect = verify
+        out = io.StringIO()
+
+        call_command('verify_pending', older_than=0, batch_size=2, workers=4, rate=0, stdout=out)
+
+        result = dict(Payment.objects.values_list('reference', 'status'))
+        self.assertEqual(result, {
+            'paid': 'successful',
+            'declined': 'failed',
+            'ongoing': 'pending',
+            'unreachable': 'pending',
+            'already-paid': 'successful',
+        })
+        self.assertEqual(Payment.objects.get(reference='paid').amount_received, Decimal('50'))
+        self.assertEqual(mock_get.call_count, 4)
+        self.assertIn('Checked 4 pending payments', out.getvalue())
+        self.assertIn('1 successful, 1 failed, 1 still in progress, 1 errors', out.getvalue())
+
+
+class RelayQueuedPaymentsTest(APITestCase):
+    def setUp(self):
+        fields = dict(
+            name='John Doe', email='john@gmail.com', phone_number='08012345678', amount=100,
+            amount_ngn=Decimal('153500'),
+        )
+        for reference in ('orphan-1', 'orphan-2', 'fresh'):
+            Payment.objects.create(reference=reference, **fields)
+        Payment.objects.exclude(reference='fresh').update(created_at=timezone.now() - timedelta(hours=1))
+
+    def states(self):
+        return dict(Payment.objects.values_list('reference', 'gateway_state'))
+
+    # Test old queued payments are rejected by default and recent ones are left alone
+    @patch('payments.gateway.requests.Session.post', side_effect=AssertionError('outbound call'))
+    def test_relay_rejects_orphans(self, mock_post):
+        out = io.StringIO()
+        call_command('relay_queued_payments', older_than=10, stdout=out)
+
+        self.assertEqual(self.states(), {'orphan-1': 'rejected', 'orphan-2': 'rejected', 'fresh': 'queued'})
+        self.assertEqual(Payment.objects.get(reference='orphan-1').status, 'failed')
+        rollup = PaymentDailyStats.objects.values('status').annotate(total=Sum('count'))
+        self.assertEqual({row['status']: row['total'] for row in rollup}, {'pending': 1, 'failed': 2})
+        self.assertIn('Relayed 2 queued payments: 0 initialized, 2 rejected', out.getvalue())
+
+    # Test --reinitialize retries with the stored reference and only rejects what Paystack refuses
+    @patch('payments.gateway.requests.Session.post')
+    def test_relay_reinitializes(self, mock_post):
+        def initialize(url, json=None, **kwargs):
+            if json['reference'] == 'orphan-2':
+                return Mock(status_code=400, json=lambda: {"status": False, "message": "Duplicate"})
+            return Mock(status_code=200, json=lambda: {
+                "status": True, "data": {"authorization_url": "https://paystack.com/pay/orphan-1"},
+            })
+        mock_post.side_effect = initialize
+        out = io.StringIO()
+
+        call_command('relay_queued_payments', older_than=10, reinitialize=True, rate=0, stdout=out)
+
+        self.assertEqual(self.states(), {'orphan-1': 'initialized', 'orphan-2': 'rejected', 'fresh': 'queued'})
+        payment = Payment.objects.get(reference='orphan-1')
+        self.assertEqual(payment.authorization_url, 'https://paystack.com/pay/orphan-1')
+        self.assertEqual(payment.amount_received, Decimal('153500'))
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertIn('1 initialized, 1 rejected, 0 already settled', out.getvalue())
+
+    # Test verification leaves queued payments to the relay instead of asking Paystack
+    @patch('payments.gateway.requests.Session.get', side_effect=AssertionError('outbound call'))
+    def test_verify_skips_queued(self, mock_get):
+        response = self.client.get(reverse('payment-verify', kwargs={'reference': 'fresh'}))
+        async_response = self.client.get(reverse('payment-verify-async', kwargs={'reference': 'fresh'}))
+        call_command('verify_pending', older_than=0, rate=0, stdout=io.StringIO())
+
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(async_response.json()['status'], 'pending')
+        mock_get.assert_not_called()
+
+
+@patch('payments.serializers.get_exchange_rate', return_value=(Decimal('1500'), 'live'))
+@patch('payments.gateway.requests.Session.post')
+class IdempotencyKeyTest(APITestCase):
+    def setUp(self):
+        self.valid_data = {
+            'name': 'John Doe',
+            'email': 'john@gmail.com',
+            'phone_number': '08012345678',
+            'amount': '100.00',
+            'country': 'United States',
+            'state': 'NY',
+        }
+        self.url = reverse('payment-initiate')
+
+    def mock_initialize(self, mock_post):
+        mock_post.return_value = Mock(
+            status_code=200,
+            json=lambda: {"status": True, "data": {"authorization_url": "http://fake", "reference": "IDEM1"}}
+        )
+
+    # Test a retried request is replayed from the stored response without a gateway call
+    def test_retry_replays_stored_response(self, mock_post, mock_rate):
+        self.mock_initialize(mock_post)
+
+        first = self.client.post(self.url, self.valid_data, format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+        second = self.client.post(self.url, self.valid_data, format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    # Test a key reused with a different body is rejected
+    def test_key_reused_with_different_body(self, mock_post, mock_rate):
+        self.mock_initialize(mock_post)
+        self.client.post(self.url, self.valid_data, format='json', HTTP_IDEMPOTENCY_KEY='key-2')
+
+        response = self.client.post(
+            self.url, dict(self.valid_data, amount='200.00'), format='json', HTTP_IDEMPOTENCY_KEY='key-2'
+        )
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(mock_post.call_count, 1)
+
+    # Test a duplicate waits for the in-flight request and then replays its response
+    def test_duplicate_waits_for_first_request(self, mock_post, mock_rate):
+        record = IdempotencyKey.objects.create(
+            key='key-3',
+            request_hash=idempotency.fingerprint(self.valid_data),
+            locked_until=timezone.now() + timedelta(minutes=5),
+            expires_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        def first_request_finishes(seconds):
+            idempotency.complete(record, 201, {"payment": {"reference": "FIRST"}, "payment_link": "http://first"})
+
+        with patch('payments.idempotency.time.sleep', side_effect=first_request_finishes):
+            response = self.client.post(self.url, self.valid_data, format='json', HTTP_IDEMPOTENCY_KEY='key-3')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['payment_link'], 'http://first')
+        mock_post.assert_not_called()
+
+    # Test the async endpoint honours the same key, so a retry can't create a second payment
+    @patch('payments.views.get_rate_table_entry', return_value=None)
+    def test_async_retry_replays_stored_response(self, mock_table, mock_post, mock_rate):
+        self.mock_initialize(mock_post)
+        url = reverse('payment-initiate-async')
+
+        first = self.client.post(url, self.valid_data, format='json', HTTP_IDEMPOTENCY_KEY='key-async')
+        second = self.client.post(url, self.valid_data, format='json', HTTP_IDEMPOTENCY_KEY='key-async')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    # Test a duplicate gives up with 409 if the first request never finishes
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_duplicate_times_out_while_first_in_progress(self, mock_post, mock_rate):
+        IdempotencyKey.objects.create(
+            key='key-4',
+            request_hash=idempotency.fingerprint(self.valid_data),
+            locked_until=timezone.now() + timedelta(minutes=5),
+            expires_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        response = self.client.post(self.url, self.valid_data, format='json', HTTP_IDEMPOTENCY_KEY='key-4')
+
+        self.assertEqual(response.status_code, 409)
+        mock_post.assert_not_called()
+
+    # Test a retry takes over a claim whose worker died once the lease has run out
+    def test_abandoned_claim_is_taken_over(self, mock_post, mock_rate):
+        self.mock_initialize(mock_post)
+        IdempotencyKey.objects.create(
+            key='key-5',
+            request_hash=idempotency.fingerprint(self.valid_data),
+            locked_until=timezone.now() - timedelta(seconds=1),
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+
+        response = self.client.post(self.url, self.valid_data, format='json', HTTP_IDEMPOTENCY_KEY='key-5')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mock_post.call_count, 1)
+        record = IdempotencyKey.objects.get(key='key-5')
+        self.assertEqual(record.status_code, 201)
+        self.assertIsNone(record.locked_until)
+        self.assertGreater(record.expires_at, timezone.now() + timedelta(hours=23))
+
+    # Test expired keys are purged
+    def test_purge_expired_keys(self, mock_post, mock_rate):
+        IdempotencyKey.objects.create(key='old', request_hash='x', expires_at=timezone.now() - timedelta(seconds=1))
+        IdempotencyKey.objects.create(key='new', request_hash='x', expires_at=timezone.now() + timedelta(hours=1))
+
+        call_command('purge_idempotency_keys', stdout=io.StringIO())
+
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
+
+
+class PaymentExportTest(APITestCase):
+    def setUp(self):
+        fields = dict(name='Jane Doe', email='jane@gmail.com', phone_number='08098765432', currency='USD')
+        self.paid = Payment.objects.create(reference='exp-1', amount=Decimal('100.00'), status='successful', **fields)
+        self.pending = Payment.objects.create(reference='exp-2', amount=Decimal('50.50'), **fields)
+        Payment.objects.filter(pk=self.pending.pk).update(created_at=timezone.now() - timedelta(days=3))
+        staff = get_user_model().objects.create_user('staff', 'staff@gmail.com', 'pass', is_staff=True)
+        self.client.force_login(staff)
+
+    # Test the export is refused to anonymous and non-staff users
+    def test_export_requires_staff(self):
+        self.client.logout()
+        response = self.client.get(reverse('payment-export'), {'format': 'csv'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+        self.client.force_login(get_user_model().objects.create_user('buyer', 'buyer@gmail.com', 'pass'))
+        response = self.client.get(reverse('payment-export'))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['detail'], 'You do not have permission to perform this action.')
+
+    # Test the CSV export streams a header and one row per payment, oldest first
+    def test_export_csv(self):
+        response = self.client.get(reverse('payment-export'), {'format': 'csv'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:2], ['id', 'reference'])
+        self.assertEqual([r[1] for r in rows[1:]], ['exp-2', 'exp-1'])
+
+    # Test NDJSON export honors status and date filters
+    def test_export_ndjson_filtered(self):
+        today = timezone.now().date().isoformat()
+        response = self.client.get(
+            reverse('payment-export'), {'format': 'ndjson', 'status': 'successful', 'start': today}
+        )
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(row['reference'], 'exp-1')
+        self.assertEqual(row['amount'], '100.00')
+
+    # Test bad filters are rejected before streaming starts
+    def test_export_rejects_bad_filters(self):
+        self.assertEqual(self.client.get(reverse('payment-export'), {'start': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('payment-export'), {'format': 'xml'}).status_code, 400)
+
+    # Test the management command writes the same stream
+    def test_export_command(self):
+        out = io.StringIO()
+        call_command('export_payments', format='ndjson', status='pending', stdout=out)
+
+        self.assertEqual([json.loads(line)['reference'] for line in out.getvalue().splitlines()], ['exp-2'])
+
+
+class PaymentDailyStatsTest(APITestCase):
+    fields = dict(name='John Doe', email='john@gmail.com', phone_number='08012345678', currency='USD', country='NG')
+
+    def rollup(self):
+        return {
+            row.status: (row.count, row.amount_sum, row.amount_received_sum)
+            for row in PaymentDailyStats.objects.all()
+        }
+
+    # Test creates, saves and webhook transitions move payments between buckets
+    def test_rollup_follows_payment_changes(self):
+        first = Payment.objects.create(reference='s-1', amount=100, **self.fields)
+        Payment.objects.create(reference='s-2', amount=50, **self.fields)
+        self.assertEqual(self.rollup(), {'pending': (2, Decimal('150'), Decimal('0'))})
+
+        first.status = 'failed'
+        first.save()
+        apply_webhook_event({"event": "charge.success", "data": {"reference": "s-1", "amount": 15000000}})
+        apply_webhook_event({"event": "charge.success", "data": {"reference": "s-1", "amount": 15000000}})
+
+        self.assertEqual(self.rollup(), {
+            'pending': (1, Decimal('50'), Decimal('0')),
+            'failed': (0, Decimal('0'), Decimal('0')),
+            'successful': (1, Decimal('100'), Decimal('150000')),
+        })
+
+    # Test the rebuild command reproduces the incrementally maintained rollup
+    def test_rebuild_matches_incremental_rollup(self):
+        Payment.objects.create(reference='s-1', amount=100, status='successful', amount_received=150000, **self.fields)
+        Payment.objects.create(reference='s-2', amount=50, **self.fields)
+        Payment.objects.bulk_create([Payment(reference='s-3', amount=25, **self.fields)])
+        Payment.objects.filter(reference='s-2').update(status='failed')
+        expected = {
+            'successful': (1, Decimal('100'), Decimal('150000')),
+            'pending': (1, Decimal('25'), Decimal('0')),
+            'failed': (1, Decimal('50'), Decimal('0')),
+        }
+        self.assertNotEqual(self.rollup(), expected)
+
+        out = io.StringIO()
+        call_command('rebuild_payment_stats', stdout=out)
+
+        self.assertEqual(self.rollup(), expected)
+        self.assertIn('Rebuilt 3 daily stats rows', out.getvalue())
+
+    # Test the stats endpoint reads the rollup with filters
+    def test_stats_endpoint(self):
+        Payment.objects.create(reference='s-1', amount=100, **self.fields)
+        Payment.objects.create(reference='s-2', amount=40, status='successful', amount_received=60000, **self.fields)
+        today = timezone.localdate().isoformat()
+
+        response = self.client.get(reverse('payment-stats'), {'start': today, 'currency': 'usd'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(row['status'], row['count']) for row in response.data], [('pending', 1), ('successful', 1)])
+        self.assertEqual(response.data[1]['amount_received_sum'], '60000.00')
+
+        response = self.client.get(reverse('payment-stats'), {'status': 'failed'})
+        self.assertEqual(response.data, [])
+        self.assertEqual(self.client.get(reverse('payment-stats'), {'end': 'soon'}).status_code, 400)
+
+
+class PaymentReadFastPathTest(APITestCase):
+    def setUp(self):
+        fields = dict(name='Zoë Doe', email='zoe@gmail.com', phone_number='08012345678', currency='USD', state='Lagos')
+        Payment.objects.create(amount=Decimal('1234.5'), amount_received=None, **fields)
+        Payment.objects.create(amount=Decimal('0.1'), amount_received=Decimal('150000'), status='successful', **fields)
+        Payment.objects.create(amount=Decimal('99999.99'), amount_received=Decimal('0'), status='failed', **fields)
+
+    def assert_identical(self):
+        formatter = row_formatter(PaymentListSerializer)
+        fast = [formatter.format(row) for row in Payment.objects.values(*formatter.sources)]
+        slow = PaymentListSerializer(Payment.objects.all(), many=True).data
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(slow))
+
+    # Test the .values() formatter renders byte-identical JSON to the serializer
+    def test_row_formatter_matches_serializer(self):
+        self.assert_identical()
+        with timezone.override('Africa/Lagos'):
+            self.assert_identical()
+
+    # Test the detail endpoint serves the formatter's output unchanged
+    def test_detail_endpoint_matches_serializer(self):
+        for payment in Payment.objects.all():
+            response = self.client.get(reverse('payment-id', kwargs={'id': payment.id}))
+            self.assertEqual(response.content, JSONRenderer().render(PaymentListSerializer(payment).data))
+
+    # Test the read-path benchmark refuses to write unless allowed, and rolls its sample rows back
+    def test_bench_read_path_command(self):
+        with self.assertRaises(CommandError):
+            call_command('bench_read_path', rows=10, repeat=1, stdout=io.StringIO())
+
+        out = io.StringIO()
+        call_command('bench_read_path', rows=10, repeat=1, allow_writes=True, stdout=out)
+        self.assertIn('Speedup', out.getvalue())
+        self.assertEqual(Payment.objects.count(), 3)
+
+
+class BenchCommandTest(SimpleTestCase):
+    # Test the bench command records a baseline and fails once a case falls behind it
+    def test_bench_flags_regressions(self):
+        path = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        options = dict(baseline=path, min_time=0.01, repeat=1, stdout=io.StringIO(), stderr=io.StringIO())
+
+        call_command('bench', 'validate_email', save_baseline=True, **options)
+        with open(path) as f:
+            baseline = json.load(f)
+        self.assertGreater(baseline['validate_email']['relative'], 0)
+
+        baseline['validate_email']['relative'] *= 100
+        with open(path, 'w') as f:
+            json.dump(baseline, f)
+        with self.assertRaisesMessage(CommandError, '1 benchmark(s) regressed'):
+            call_command('bench', 'validate_email', **options)
+
+
+class LoadTestStubTest(SimpleTestCase):
+    def setUp(self):
+        self.server = make_server(port=0, state=StubState())
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    # Test the stub speaks the Paystack and exchange-rate contracts the app relies on
+    def test_stub_serves_gateway_and_rates(self):
+        client = PaystackClient(
+            secret_key='sk', initialize_url=f'{self.base}/transaction/initialize',
+            verify_url=f'{self.base}/transaction/verify',
+        )
+        data = client.initialize_transaction({'email': 'a@gmail.com', 'amount': 150000, 'reference': 'load-1'})
+        self.assertEqual(data['reference'], 'load-1')
+        self.assertEqual(client.verify_transaction('load-1')['amount'], 150000)
+        with self.assertRaises(GatewayError):
+            client.verify_transaction('unknown')
+
+        with patch.dict(os.environ, {'CONVERSION_URL': f'{self.base}/v6', 'EXCHANGE_RATE_API_KEY': 'k'}):
+            clear_rate_cache()
+            self.assertEqual(get_live_exchange_rate(to_currency='NGN', from_currency='USD'), Decimal('1535'))
+            self.assertEqual(get_live_exchange_rate(to_currency='GBP', from_currency='USD'), Decimal('0.79'))
+        clear_rate_cache()
+
+        with patch('payments.conversions._fetch_rate_table', return_value=None), \
+                override_settings(EXCHANGE_RATE_SECONDARY_URL=f'{self.base}/open/v6/latest'):
+            self.assertEqual(get_exchange_rate('USD'), (Decimal('1535'), 'secondary'))
+        clear_rate_cache()
+
+    # Test injected errors surface as gateway failures
+    def test_stub_error_injection(self):
+        self.server.RequestHandlerClass.state.error_rate['initialize'] = 1.0
+        client = PaystackClient(secret_key='sk', initialize_url=f'{self.base}/transaction/initialize')
+        with self.assertRaises(GatewayError):
+            client.initialize_transaction({'email': 'a@gmail.com', 'amount': 100})
+
+
+class MetricsTest(APITestCase):
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    # Test view latency, DB queries and upstream failures are exposed at /metrics
+    @patch('payments.gateway.requests.Session.get', side_effect=requests.ConnectionError('down'))
+    def test_metrics_endpoint(self, mock_get):
+        Payment.objects.create(
+            name='John Doe', email='john@gmail.com', phone_number='08012345678', amount=100, reference='m-1',
+            gateway_state='initialized',
+        )
+        requests_before = self.sample('payments_http_request_seconds_count', view='payment-list', method='GET', status='200')
+        errors_before = self.sample(
+            'payments_upstream_errors_total', upstream='paystack', operation='verify', reason='ConnectionError'
+        )
+
+        self.client.get(reverse('payment-list'))
+        self.client.get(reverse('payment-verify', kwargs={'reference': 'm-1'}))
+
+        self.assertEqual(
+            self.sample('payments_http_request_seconds_count', view='payment-list', method='GET', status='200'),
+            requests_before + 1,
+        )
+        self.assertGreater(self.sample('payments_http_request_db_queries_sum', view='payment-list'), 0)
+        self.assertEqual(
+            self.sample('payments_upstream_errors_total', upstream='paystack', operation='verify', reason='ConnectionError'),
+            errors_before + 1,
+        )
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'payments_upstream_request_seconds_bucket{', response.content)
+        self.assertNotIn(b'view="metrics"', response.content)
+
+
+
+class PaymentAdminTest(APITestCase):
+    def setUp(self):
+        clear_verify_cache()
+        admin_user = get_user_model().objects.create_superuser('admin', 'admin@gmail.com', 'pass')
+        self.client.force_login(admin_user)
+        self.url = reverse('admin:payments_payment_changelist')
+        for i, (status_, currency) in enumerate([('pending', 'USD'), ('successful', 'USD'), ('pending', 'GBP')]):
+            Payment.objects.create(
+                name='John Doe', email=f'buyer{i}@gmail.com', phone_number='08012345678', amount=100,
+                amount_received=Decimal('153500'), currency=currency, status=status_, reference=f'adm-{i}',
+                gateway_state='initialized',
+            )
+
+    # Test the changelist filters and searches by exact reference or email prefix, without a full count
+    def test_changelist_filters_and_search(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'status__exact': 'pending', 'currency': 'USD'})
+        self.assertEqual([p.reference for p in response.context['cl'].result_list], ['adm-0'])
+        self.assertFalse([q for q in queries.captured_queries if 'DISTINCT' in q['sql']])
+        self.assertEqual(sum('COUNT(' in q['sql'] for q in queries.captured_queries), 1)
+
+        response = self.client.get(self.url, {'q': 'buyer2@'})
+        self.assertEqual([p.reference for p in response.context['cl'].result_list], ['adm-2'])
+        response = self.client.get(self.url, {'q': 'adm-1'})
+        self.assertEqual([p.reference for p in response.context['cl'].result_list], ['adm-1'])
+        response = self.client.get(self.url, {'q': 'gmail.com'})
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+    # Test large result sets use the planner estimate instead of COUNT(*)
+    @patch('payments.pagination.planner_estimate', return_value=2_500_000)
+    def test_estimated_count(self, mock_estimate):
+        paginator = EstimatedCountPaginator(Payment.objects.all(), 100)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.count, 2_500_000)
+        self.assertEqual(len(queries), 0)
+
+        mock_estimate.return_value = 3
+        self.assertEqual(EstimatedCountPaginator(Payment.objects.all(), 100).count, 3)
+
+    # Test the re-verify action settles pending rows only and reports the outcome
+    @patch('payments.gateway.requests.Session.get')
+    def test_reverify_action(self, mock_get):
+        mock_get.return_value = Mock(status_code=200, json=lambda: {
+            "status": True, "data": {"status": "success", "amount": 15350000},
+        })
+        response = self.client.post(self.url, {
+            'action': 'reverify', '_selected_action': list(Payment.objects.values_list('pk', flat=True)),
+        }, follow=True)
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(Payment.objects.filter(status='successful').count(), 3)
+        self.assertContains(response, 'Re-verified 2 pending payments: 2 updated, 0 unchanged, 0 errors.')
+
+    # Test selections above the limit are refused without calling Paystack
+    @override_settings(PAYMENTS_ADMIN_REVERIFY_LIMIT=1)
+    @patch('payments.gateway.requests.Session.get', side_effect=AssertionError('outbound call'))
+    def test_reverify_refuses_large_selection(self, mock_get):
+        response = self.client.post(self.url, {
+            'action': 'reverify', '_selected_action': list(Payment.objects.values_list('pk', flat=True)),
+        }, follow=True)
+
+        self.assertContains(response, 'Select at most 1 pending payments to re-verify')
+        self.assertEqual(Payment.objects.filter(status='pending').count(), 2)
+
+    # Test the export action streams the selected rows as CSV
+    def test_export_action(self):
+        selected = Payment.objects.filter(currency='USD').values_list('pk', flat=True)
+        response = self.client.post(self.url, {'action': 'export_csv', '_selected_action': list(selected)})
+
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual([row[1] for row in rows[1:]], ['adm-0', 'adm-1'])
+        self.assertEqual(rows[1][5], '100.00')
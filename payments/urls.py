@@ -1,9 +1,18 @@
 from django.urls import path
-from payments.views import PaymentVerificationView, PaymentView, PaymentListAllTransactionView, PaymentIdView
+from payments.views import (
+    PaymentVerificationView, PaymentView, PaymentBulkView, PaymentListAllTransactionView, PaymentIdView,
+    PaymentStatsView, PaystackWebhookView, export_payments, initiate_payment_async, verify_payment_async,
+)
 
 urlpatterns = [
     path('payment/', PaymentView.as_view(), name='payment-initiate'),
     path('payment/verify/<str:reference>/', PaymentVerificationView.as_view(), name='payment-verify'),
+    path('payment/webhook/', PaystackWebhookView.as_view(), name='payment-webhook'),
+    path('payments/bulk/', PaymentBulkView.as_view(), name='payment-bulk'),
+    path('payments/export/', export_payments, name='payment-export'),
+    path('payments/stats/', PaymentStatsView.as_view(), name='payment-stats'),
     path('payments/', PaymentListAllTransactionView.as_view(), name='payment-list'),
-    path('payment/<str:id>/', PaymentIdView.as_view(), name='payment-id')
+    path('payment/<str:id>/', PaymentIdView.as_view(), name='payment-id'),
+    path('async/payment/', initiate_payment_async, name='payment-initiate-async'),
+    path('async/payment/verify/<str:reference>/', verify_payment_async, name='payment-verify-async'),
 ]
\ No newline at end of file
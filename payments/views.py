@@ -1,14 +1,35 @@
-from rest_framework.generics import CreateAPIView, RetrieveAPIView, ListAPIView
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from rest_framework.generics import CreateAPIView, RetrieveAPIView, ListAPIView, get_object_or_404
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-import os
-import requests
-from decimal import Decimal
+from rest_framework.exceptions import ValidationError
 from dotenv import load_dotenv
-from django.http import Http404
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 
-from payments.models import Payment
-from .serializers import PaymentSerializer, PaymentVerificationSerializer, PaymentListSerializer
+from payments.models import STATUS, Payment, PaymentDailyStats
+from . import idempotency
+from .conditional import not_modified, page_etag, payment_etag, representations, set_validators
+from .conversions import get_rate_table_entry
+from .export import EXPORT_FORMATS, export_rows, iter_export, parse_filters
+from .gateway import GatewayError, get_paystack_client
+from .pagination import PaymentCursorPagination
+from .serializers import (
+    PaymentSerializer, PaymentVerificationSerializer, PaymentListSerializer, PaymentDailyStatsSerializer,
+    detect_country_code,
+)
+from .services import (
+    apply_webhook_event, fetch_verification, initialize_many, initiate_payment, needs_verification, new_payment,
+    settle_verification, verify_payment,
+)
+from .stats import record_created
 
 load_dotenv()  # Load environment variables from a .env file if present
 
@@ -20,9 +41,16 @@ def home(request):
         "message": "Welcome to Payment API!",
         "available_paths": {
             "Admin": "/admin/",
+            "Metrics": "/metrics",
             "List Payments": "/api/v1/payments/",
+            "Export Payments": "/api/v1/payments/export/?format=csv|ndjson&start=&end=&status=",
+            "Payment Stats": "/api/v1/payments/stats/?start=&end=&currency=&country=&status=",
             "Initiate Payment": "/api/v1/payment/",
+            "Initiate Payments in Bulk": "/api/v1/payments/bulk/",
             "Verify Payment": "/api/v1/payment/verify/<reference>/",
+            "Paystack Webhook": "/api/v1/payment/webhook/",
+            "Initiate Payment (async)": "/api/v1/async/payment/",
+            "Verify Payment (async)": "/api/v1/async/payment/verify/<reference>/",
         },
         "note": "Replace <reference> with your actual payment reference."
     })
@@ -33,21 +61,72 @@ class PaymentView(CreateAPIView):
     serializer_class = PaymentSerializer
 
     def create(self, request, *args, **kwargs):
+        status_code, body, headers = idempotency.run(
+            request.headers.get('Idempotency-Key'), request.data, lambda: self.initiate(request)
+        )
+        return Response(body, status=status_code, headers=headers)
+
+    def initiate(self, request):
         serializer = self.get_serializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
 
         payment = serializer.save()  # Serializer handles Paystack call
 
-        payment_data = PaymentSerializer(payment).data
-        # Return payment data + authorization URL
+        # Payment data + authorization URL
+        return status.HTTP_201_CREATED, {
+            "payment": PaymentSerializer(payment).data,
+            "payment_link": getattr(serializer, '_authorization_url', None)
+        }
+
+
+class PaymentBulkView(APIView):
+    """
+    Initiate a batch of payments: one INSERT, concurrent Paystack calls, one UPDATE.
+    Each item gets its own result, so one bad item doesn't sink the batch.
+    """
+
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "Expected a non-empty list of payments."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.PAYMENTS_BULK_MAX_ITEMS:
+            return Response(
+                {"detail": f"At most {settings.PAYMENTS_BULK_MAX_ITEMS} payments per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Validate item by item so valid rows survive their invalid neighbours
+        serializer = PaymentSerializer(data=items, many=True, context={'request': request})
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            try:
+                validated_data = serializer.child.run_validation(item)
+            except ValidationError as e:
+                results[index] = {"index": index, "status": "invalid", "errors": e.detail}
+                continue
+            valid.append((index, validated_data))
+
+        if valid:
+            with transaction.atomic():
+                payments = Payment.objects.bulk_create([new_payment(data) for _, data in valid])
+                record_created(payments)
+            initialized = initialize_many(payments, get_paystack_client(), settings.PAYMENTS_BULK_WORKERS)
+
+            for (index, _), (payment, auth_url, error) in zip(valid, initialized):
+                result = {"index": index, "payment": PaymentSerializer(payment).data}
+                if error:
+                    result.update(status="failed", detail=error)
+                else:
+                    result.update(status="created", payment_link=auth_url)
+                results[index] = result
+
+        all_created = all(r['status'] == 'created' for r in results)
         return Response(
-            {
-                "payment": payment_data,
-                "payment_link": getattr(serializer, '_authorization_url', None)
-            },
-            status=status.HTTP_201_CREATED
+            {"results": results},
+            status=status.HTTP_201_CREATED if all_created else status.HTTP_207_MULTI_STATUS
         )
-    
+
 
 class PaymentVerificationView(RetrieveAPIView):
     queryset = Payment.objects.all()
@@ -71,41 +150,120 @@ class PaymentVerificationView(RetrieveAPIView):
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()  # fetch payment by reference
 
-        # Call Paystack verify endpoint
-        headers = {
-            'Authorization': f'Bearer {os.getenv("TEST_SECRET_KEY")}',
-        }
-        response = requests.get(
-            f"{os.getenv('VERIFY_URL')}/{instance.reference}",
-            headers=headers,
-            timeout=10
-        )
-
-        response_data = response.json()
-        if response.status_code != 200 or not response_data.get('status'):
+        # Final and still-queued payments are served as stored; pending ones are checked with Paystack
+        try:
+            verify_payment(instance)
+        except GatewayError:
             return Response(
                 {"detail": "Failed to verify transaction with Paystack."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Update payment status
-        data = response_data.get('data', {})
-        if data.get('status') == 'success':
-            instance.status = 'successful'
-            amount_paid = Decimal(data.get('amount', 0)) / 100  # kobo → naira
-            instance.amount_received = amount_paid
-        else:
-            instance.status = 'failed'
-
-        instance.save(update_fields=['status', 'amount_received'])
-
         serializer = self.get_serializer(instance)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class PaystackWebhookView(APIView):
+    """
+    Receives Paystack events and settles payments without calling Paystack back.
+    """
+    authentication_classes = []
+    permission_classes = []
+
+    def post(self, request, *args, **kwargs):
+        body = request.body
+        signature = request.META.get('HTTP_X_PAYSTACK_SIGNATURE', '')
+        if not get_paystack_client().verify_signature(body, signature):
+            return Response({"detail": "Invalid signature."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            event = json.loads(body)
+        except ValueError:
+            return Response({"detail": "JSON parse error."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Acknowledge every authentic event, even ones we ignore, so Paystack stops retrying
+        apply_webhook_event(event if isinstance(event, dict) else {})
+        return Response(status=status.HTTP_200_OK)
+
+
+@require_GET
+def export_payments(request):
+    """
+    Stream the ledger as CSV or NDJSON with constant memory. Staff only: rows carry
+    customer emails and phone numbers.
+    Query params: format (csv|ndjson), start/end (YYYY-MM-DD, inclusive), status.
+    """
+    # A 403 rather than a redirect to the admin login, which export clients would save as the file
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=status.HTTP_403_FORBIDDEN
+        )
+    if not request.user.is_staff:
+        return JsonResponse(
+            {"detail": "You do not have permission to perform this action."}, status=status.HTTP_403_FORBIDDEN
+        )
+
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse(
+            {"detail": f"'format' must be one of: {', '.join(EXPORT_FORMATS)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        filters = parse_filters(request.GET.get('start'), request.GET.get('end'), request.GET.get('status'))
+    except ValueError as e:
+        return JsonResponse({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(iter_export(fmt, export_rows(filters)), content_type=EXPORT_FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="payments.{fmt}"'
+    return response
+
+
 class PaymentListAllTransactionView(ListAPIView):
     queryset = Payment.objects.all()
     serializer_class = PaymentListSerializer
+    pagination_class = PaymentCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        """
+        Page through (id, version) pairs first; an unchanged page is a 304 without
+        loading or serializing any payment, and a changed one reuses cached rows.
+        """
+        rows = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()).values('id', 'version', 'created_at', 'updated_at')
+        )
+        etag = page_etag(rows, self.paginator.get_next_link(), self.paginator.get_previous_link())
+        last_modified = max((row['updated_at'] for row in rows), default=None)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = self.get_paginated_response(representations(rows, self.get_serializer_class()))
+        return set_validators(response, etag, last_modified)
+
+class PaymentStatsView(ListAPIView):
+    """
+    Daily volume per (day, currency, country, status), read from the rollup table.
+    Query params: start/end (YYYY-MM-DD, inclusive), currency, country, status.
+    """
+    serializer_class = PaymentDailyStatsSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = PaymentDailyStats.objects.all()
+        for name, lookup in (('start', 'day__gte'), ('end', 'day__lte')):
+            if params.get(name):
+                day = parse_date(params[name])
+                if day is None:
+                    raise ValidationError({name: "Must be a date in YYYY-MM-DD format."})
+                queryset = queryset.filter(**{lookup: day})
+        for name in ('currency', 'country'):
+            if params.get(name):
+                queryset = queryset.filter(**{name: params[name].upper()})
+        if params.get('status'):
+            if params['status'] not in dict(STATUS):
+                raise ValidationError({'status': f"Must be one of: {', '.join(dict(STATUS))}."})
+            queryset = queryset.filter(status=params['status'])
+        return queryset
 
 class PaymentIdView(RetrieveAPIView):
     queryset = Payment.objects.all()
@@ -113,4 +271,79 @@ class PaymentIdView(RetrieveAPIView):
     lookup_field = 'id'
     lookup_url_kwarg = 'id'
 
+    def retrieve(self, request, *args, **kwargs):
+        """Answer status polls from the version alone: a 304, or the cached representation."""
+        row = get_object_or_404(
+            self.get_queryset().values('id', 'version', 'updated_at'),
+            **{self.lookup_field: self.kwargs[self.lookup_url_kwarg]}
+        )
+        etag = payment_etag(row['id'], row['version'])
+        response = not_modified(request, etag, row['updated_at'])
+        if response is None:
+            data = representations([row], self.get_serializer_class())
+            if not data:
+                raise Http404("Payment not found.")
+            response = Response(data[0])
+        return set_validators(response, etag, row['updated_at'])
+
+
+# ---------- Async views (serve through mainapp.asgi) ----------
+# Lookups that don't touch the database run on worker threads (thread_sensitive=False)
+# so they can overlap; database work runs in the request's own sync thread.
+
+@csrf_exempt
+@require_POST
+async def initiate_payment_async(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({"detail": "JSON parse error."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # The rate table and geo-IP lookup don't depend on each other; fetch them together
+    context = {'request': request}
+    lookups = [sync_to_async(get_rate_table_entry, thread_sensitive=False)()]
+    if isinstance(data, dict) and not (data.get('country') or '').strip():
+        lookups.append(sync_to_async(detect_country_code, thread_sensitive=False)(request))
+    results = await asyncio.gather(*lookups)
+    context['rate_table'] = results[0]
+    if len(results) > 1:
+        context['detected_country'] = results[1]
+
+    def initiate():
+        serializer = PaymentSerializer(data=data, context=context)
+        if not serializer.is_valid():
+            return status.HTTP_400_BAD_REQUEST, serializer.errors
+        payment, auth_url, error = initiate_payment(serializer.validated_data)
+        if error:
+            return status.HTTP_400_BAD_REQUEST, [error]
+        return status.HTTP_201_CREATED, {
+            "payment": PaymentSerializer(payment).data,
+            "payment_link": auth_url
+        }
+
+    # Same Idempotency-Key handling as PaymentView
+    status_code, body, headers = await sync_to_async(idempotency.run)(
+        request.headers.get('Idempotency-Key'), data, initiate
+    )
+    return JsonResponse(body, status=status_code, headers=headers, safe=False)
+
+
+@require_GET
+async def verify_payment_async(request, reference):
+    try:
+        instance = await Payment.objects.aget(reference=reference)
+    except Payment.DoesNotExist:
+        return JsonResponse({"detail": "Payment not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    # Final and still-queued payments are served as stored; pending ones are checked with Paystack
+    if needs_verification(instance):
+        try:
+            data = await sync_to_async(fetch_verification, thread_sensitive=False)(instance.reference)
+        except GatewayError:
+            return JsonResponse(
+                {"detail": "Failed to verify transaction with Paystack."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        await sync_to_async(settle_verification)(instance, data)
 
+    return JsonResponse(PaymentVerificationSerializer(instance).data, status=status.HTTP_200_OK)